@@ -0,0 +1,139 @@
+#! python3
+"""Loads a TIMS snapshot without Revit, e.g. from a scheduled job on an ingest host.
+
+Usage: python cli.py [--base-url URL] [--output PATH] [--sections ID ...] [--chainage FROM TO]
+                     [--time-from 2021-03-01T06:00] [--time-to 2021-03-31T18:00]
+       python cli.py --output data/tims.sqlite --import-snapshot tims01032021_060000.json
+       python cli.py --output data/tims.sqlite --export-snapshot part.ndjson [--chainage FROM TO] ...
+       python cli.py --output data/tims.sqlite --rollup reports [--bin-meter 25] [--chainage FROM TO] ...
+
+The login is read from --username/--password, the TIMS_USERNAME/TIMS_PASSWORD environment variables or the
+credentials module of the pushbutton. Without filters the store, or the newest snapshot file next to the output,
+is synced incrementally. With filters only the matching rounds are downloaded and upserted into the store, or
+written to a new snapshot file.
+"""
+import argparse
+import datetime
+import os
+import sys
+
+# pyRevit puts the extension's lib folder on the path, outside Revit it is added here
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))))), 'lib'))
+
+import script as loader  # noqa: E402
+import material_rollup  # noqa: E402
+import snapshot_store  # noqa: E402
+from round_filter import RoundFilter  # noqa: E402
+from tims_client import DEFAULT_BASE_URL  # noqa: E402
+
+
+def parse_arguments(arguments):
+    parser = argparse.ArgumentParser(description='Loads construction data from TIMS into a snapshot file.')
+    parser.add_argument('--base-url', default=os.environ.get('TIMS_BASE_URL', DEFAULT_BASE_URL))
+    parser.add_argument('--username', default=os.environ.get('TIMS_USERNAME'))
+    parser.add_argument('--password', default=os.environ.get('TIMS_PASSWORD'))
+    parser.add_argument('--output', help='store (.sqlite), snapshot file (.ndjson or .json) or directory, '
+                                         'defaults to the data folder')
+    parser.add_argument('--sections', type=int, nargs='+', metavar='ID', help='only load these section ids')
+    parser.add_argument('--chainage', type=float, nargs=2, metavar=('FROM', 'TO'),
+                        help='only load rounds overlapping this chainage range in meters')
+    parser.add_argument('--time-from', type=parse_datetime, help='only load rounds ending at or after this time')
+    parser.add_argument('--time-to', type=parse_datetime, help='only load rounds starting before this time')
+    parser.add_argument('--cache-directory', help='response cache folder, defaults to data/cache')
+    parser.add_argument('--offline', action='store_true', help='serve every request from the response cache')
+    parser.add_argument('--import-snapshot', metavar='PATH', help='upsert a snapshot file into the store and exit')
+    parser.add_argument('--export-snapshot', metavar='PATH',
+                        help='write the rounds of the store matching the filters to a snapshot file and exit')
+    parser.add_argument('--rollup', metavar='DIRECTORY',
+                        help='write material rollups of the rounds matching the filters to DIRECTORY and exit')
+    parser.add_argument('--bin-meter', type=parse_bin_meter, default=loader.MATERIAL_ROLLUP_BIN_METER,
+                        help='chainage bin length of the rollup')
+    return parser.parse_args(arguments)
+
+
+def parse_datetime(value):
+    for datetime_format in ('%Y-%m-%dT%H:%M', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(value, datetime_format)
+        except ValueError:
+            continue
+    raise argparse.ArgumentTypeError('Expected a time like 2021-03-01T06:00, got ' + value)
+
+
+def parse_bin_meter(value):
+    try:
+        bin_meter = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError('Expected a length in meters, got ' + value)
+    if not bin_meter > 0:
+        raise argparse.ArgumentTypeError('Expected a positive length in meters, got ' + value)
+    return bin_meter
+
+
+def create_round_filter(arguments):
+    start_meter, end_meter = arguments.chainage if arguments.chainage else (None, None)
+    return RoundFilter(arguments.sections, start_meter, end_meter, arguments.time_from, arguments.time_to)
+
+
+def get_output_path(output):
+    if output is None:
+        directory = loader.get_data_directory()
+    elif os.path.isdir(output) or not os.path.splitext(output)[1]:
+        directory = output
+    else:
+        directory = os.path.dirname(os.path.abspath(output))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    if output is None or directory == output:
+        return loader.create_file_path(directory)
+    return output
+
+
+def convert_store(arguments):
+    store_path = get_output_path(arguments.output)
+    if not store_path.endswith(snapshot_store.SQLITE_EXTENSION):
+        raise SystemExit('--import-snapshot and --export-snapshot need a ' + snapshot_store.SQLITE_EXTENSION +
+                         ' store as --output')
+    with snapshot_store.SnapshotStore(store_path) as store:
+        if arguments.import_snapshot:
+            store.import_snapshot(arguments.import_snapshot)
+            print("Imported {} into {}, which now holds {} rounds".format(arguments.import_snapshot, store_path,
+                                                                          len(store)))
+        if arguments.export_snapshot:
+            round_filter = create_round_filter(arguments)
+            store.export_snapshot(arguments.export_snapshot, section_ids=round_filter.section_ids,
+                                  start_meter=round_filter.start_meter, end_meter=round_filter.end_meter,
+                                  start_time=round_filter.start_time, end_time=round_filter.end_time)
+            print("Exported {} to {}".format(store_path, arguments.export_snapshot))
+
+
+def write_material_rollup(arguments):
+    if not material_rollup.is_available():
+        raise SystemExit('--rollup needs NumPy, install it into the Python running the CLI')
+    report_path = loader.write_material_rollup(get_output_path(arguments.output), arguments.rollup,
+                                               create_round_filter(arguments), arguments.bin_meter)
+    print("Material rollup written to " + report_path)
+
+
+def main(arguments):
+    arguments = parse_arguments(arguments)
+    if arguments.import_snapshot or arguments.export_snapshot:
+        return convert_store(arguments)
+    if arguments.rollup:
+        return write_material_rollup(arguments)
+    client = loader.create_client(arguments.base_url, arguments.username, arguments.password,
+                                  arguments.cache_directory, arguments.offline)
+    try:
+        file_path = loader.load_and_store_data(client, get_output_path(arguments.output),
+                                               create_round_filter(arguments))
+        print("Snapshot written to " + file_path)
+    finally:
+        client.close()
+        if client.cache is not None:
+            print(client.cache.summary())
+        loader.report_instrumentation(client)
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -5,3 +5,36 @@ class CrossSection(Enum):
     KALLOTE = 1
     STROSSE = 2
     SOHLE = 3
+
+    @property
+    def label(self):
+        """Name written to snapshots, which the generator selects cross sections by."""
+        return CROSS_SECTION_LABELS[self]
+
+
+CROSS_SECTION_LABELS = {
+    CrossSection.KALLOTE: 'Kalotte',
+    CrossSection.STROSSE: 'Strosse',
+    CrossSection.SOHLE: 'Sohle',
+}
+
+
+def get_cross_section(value):
+    """Maps the cross section of a TIMS round, given by id, name or related object, to a CrossSection, or to None
+    for ids and names it does not know.
+
+    Rounds without one were driven in the top heading, as every round was before cross sections were loaded.
+    """
+    if isinstance(value, dict):
+        value = value.get('name', value.get('id'))
+    if value is None or value == '':
+        return CrossSection.KALLOTE
+    if isinstance(value, int):
+        try:
+            return CrossSection(value)
+        except ValueError:
+            return None
+    for cross_section, label in CROSS_SECTION_LABELS.items():
+        if str(value).strip().lower() in (label.lower(), cross_section.name.lower()):
+            return cross_section
+    return None
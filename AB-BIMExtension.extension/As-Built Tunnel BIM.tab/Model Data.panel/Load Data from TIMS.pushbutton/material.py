@@ -1,5 +1,14 @@
+import sys
+
+
 class Material:
+    __slots__ = ('name', 'value_type', 'value')
+
     def __init__(self, name, value_type, value):
-        self.name = name
-        self.value_type = value_type
+        # Every round repeats the same few measure definitions and units
+        self.name = sys.intern(name)
+        self.value_type = sys.intern(value_type)
         self.value = value
+
+    def to_dict(self):
+        return {'name': self.name, 'value_type': self.value_type, 'value': self.value}
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+
+INDEX_FILE_NAME = 'index.json'
+DEFAULT_MAX_SIZE_BYTES = 200 * 1024 * 1024
+
+
+class CacheMissException(Exception):
+    pass
+
+
+class CachedResponse:
+    def __init__(self, key, body, etag, last_modified, stored_at):
+        self.key = key
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = stored_at
+
+    def validation_headers(self):
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+    """Persistent TIMS response cache keyed by endpoint and query, evicting least recently used entries."""
+
+    def __init__(self, directory, ttls=None, default_ttl=0, max_size_bytes=DEFAULT_MAX_SIZE_BYTES, offline=False):
+        self.directory = directory
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_size_bytes = max_size_bytes
+        self.offline = offline
+        self.hits = 0
+        self.revalidations = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+        # Kept up to date under the lock, so stores only sort the index when the cache runs over its size
+        self._total_size = sum(entry['size'] for entry in self._index.values())
+
+    def lookup(self, endpoint, url):
+        """Returns (cached response or None, whether it can be served without asking the server)."""
+        key = create_key(endpoint, url)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None, False
+            entry['last_access'] = time.time()
+        try:
+            with open(self._body_path(key), 'rb') as f:
+                body = f.read()
+        except (IOError, OSError):
+            with self._lock:
+                self._remove_entry(key)
+            return None, False
+        cached = CachedResponse(key, body, entry.get('etag'), entry.get('last_modified'), entry['stored_at'])
+        is_fresh = self.offline or time.time() - cached.stored_at < self.ttls.get(endpoint, self.default_ttl)
+        if is_fresh:
+            with self._lock:
+                self.hits += 1
+        return cached, is_fresh
+
+    def store(self, endpoint, url, body, etag=None, last_modified=None):
+        key = create_key(endpoint, url)
+        with open(self._body_path(key), 'wb') as f:
+            f.write(body)
+        now = time.time()
+        with self._lock:
+            self.misses += 1
+            self._remove_entry(key)
+            self._total_size += len(body)
+            self._index[key] = {
+                'endpoint': endpoint,
+                'etag': etag,
+                'last_modified': last_modified,
+                'stored_at': now,
+                'last_access': now,
+                'size': len(body),
+            }
+            self._evict()
+
+    def refresh(self, cached):
+        """Marks a cached response as revalidated by the server."""
+        with self._lock:
+            self.revalidations += 1
+            entry = self._index.get(cached.key)
+            if entry is not None:
+                entry['stored_at'] = time.time()
+
+    def save(self):
+        with self._lock:
+            with open(os.path.join(self.directory, INDEX_FILE_NAME), 'w') as f:
+                json.dump(self._index, f)
+
+    def summary(self):
+        return "Response cache: {} hits, {} revalidated, {} misses".format(self.hits, self.revalidations,
+                                                                           self.misses)
+
+    def _evict(self):
+        if self._total_size <= self.max_size_bytes:
+            return
+        for key in sorted(self._index, key=lambda k: self._index[k]['last_access']):
+            if self._total_size <= self.max_size_bytes:
+                break
+            self._remove_entry(key)
+            try:
+                os.remove(self._body_path(key))
+            except OSError:
+                pass
+
+    def _remove_entry(self, key):
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self._total_size -= entry['size']
+
+    def _load_index(self):
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE_NAME), 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    def _body_path(self, key):
+        return os.path.join(self.directory, key + '.json')
+
+
+def create_key(endpoint, url):
+    return hashlib.sha1((endpoint + ' ' + url).encode('utf-8')).hexdigest()
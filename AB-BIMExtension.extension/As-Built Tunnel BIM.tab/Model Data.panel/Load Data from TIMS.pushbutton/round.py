@@ -1,4 +1,7 @@
 class Round:
+    __slots__ = ('id', 'start_meter', 'end_meter', 'cross_section_type', 'comment', 'start_datetime', 'end_datetime',
+                 'duration', 'material')
+
     def __init__(self, id, start_meter, end_meter, cross_section_type, comment, start_datetime, end_datetime, duration):
         self.id = id
         self.start_meter = start_meter
@@ -10,5 +13,18 @@ class Round:
         self.duration = duration
         self.material = []
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'start_meter': self.start_meter,
+            'end_meter': self.end_meter,
+            'cross_section_type': self.cross_section_type,
+            'comment': self.comment,
+            'start_datetime': self.start_datetime,
+            'end_datetime': self.end_datetime,
+            'duration': self.duration,
+            'material': self.material,
+        }
+
     def __str__(self):
         return f'Round(start_meter: {self.start_meter}, end_meter: {self.end_meter}, cross_section_type: {self.cross_section_type}, comment: {self.comment}'
@@ -0,0 +1,41 @@
+class RoundFilter:
+    """Restricts a TIMS download to some sections, a chainage range and a time window, evaluated by the server."""
+
+    def __init__(self, section_ids=None, start_meter=None, end_meter=None, start_time=None, end_time=None):
+        self.section_ids = list(section_ids) if section_ids else None
+        self.start_meter = start_meter
+        self.end_meter = end_meter
+        # datetime.datetime, sent as Tryton datetime objects; the window ends before end_time like the store's does
+        self.start_time = start_time
+        self.end_time = end_time
+
+    def is_empty(self):
+        return self.section_ids is None and self.start_meter is None and self.end_meter is None and \
+            self.start_time is None and self.end_time is None
+
+    def get_section_query(self):
+        if self.section_ids is None:
+            return None
+        return [["id", "in", self.section_ids]]
+
+    def get_round_query(self, section_id):
+        """Rounds of the section overlapping both the chainage range and the time window."""
+        query = [["section", "=", section_id]]
+        if self.start_meter is not None:
+            query.append(["end_chainage", ">=", self.start_meter])
+        if self.end_meter is not None:
+            query.append(["start_chainage", "<=", self.end_meter])
+        if self.start_time is not None:
+            query.append(["end_time", ">=", to_tryton_datetime(self.start_time)])
+        if self.end_time is not None:
+            query.append(["start_time", "<", to_tryton_datetime(self.end_time)])
+        return query
+
+
+def to_tryton_datetime(value):
+    """Tryton's JSON encoding of a datetime, the form round times come back in."""
+    return {'__class__': 'datetime', 'year': value.year, 'month': value.month, 'day': value.day, 'hour': value.hour,
+            'minute': value.minute, 'second': value.second, 'microsecond': value.microsecond}
+
+
+NO_FILTER = RoundFilter()
@@ -0,0 +1,173 @@
+from array import array
+import datetime
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+# Stands in for missing numbers, e.g. rounds without a chainage, which no TIMS number takes
+MISSING = float('nan')
+
+
+class StringTable:
+    """Interns repeated strings and refers to them by index."""
+
+    def __init__(self):
+        self.values = []
+        self._indexes = {}
+
+    def add(self, value):
+        index = self._indexes.get(value)
+        if index is None:
+            index = len(self.values)
+            self._indexes[value] = index
+            self.values.append(value)
+        return index
+
+    def __getitem__(self, index):
+        return self.values[index]
+
+
+class NumberColumn:
+    """Stores numbers as doubles, remembering which ones were integers so JSON output stays unchanged.
+
+    None is stored as NaN and read back as None.
+    """
+
+    def __init__(self):
+        self.values = array('d')
+        self.is_integer = array('b')
+
+    def append(self, value):
+        self.values.append(MISSING if value is None else value)
+        self.is_integer.append(isinstance(value, int))
+
+    def __getitem__(self, index):
+        value = self.values[index]
+        # NaN compares unequal to itself
+        if value != value:
+            return None
+        return int(value) if self.is_integer[index] else value
+
+    def __len__(self):
+        return len(self.values)
+
+
+class RoundTable:
+    """Column-oriented snapshot rounds with interned texts, material names and units."""
+
+    def __init__(self):
+        self.sections = []
+        self._section_indexes = {}
+        self.section_index = array('l')
+        self.id = array('q')
+        self.start_meter = NumberColumn()
+        self.end_meter = NumberColumn()
+        self.start_minute = array('q')
+        self.end_minute = array('q')
+        self.cross_section_type = array('l')
+        self.comment = array('l')
+        self.duration = array('l')
+        self.texts = StringTable()
+        self.material_offset = array('q', [0])
+        self.material_name = array('l')
+        self.material_unit = array('l')
+        self.material_value = NumberColumn()
+        self.material_names = StringTable()
+        self.material_units = StringTable()
+
+    def add_section(self, section_id, section_name):
+        index = self._section_indexes.get(section_id)
+        if index is None:
+            index = len(self.sections)
+            self._section_indexes[section_id] = index
+            self.sections.append((section_id, section_name))
+        return index
+
+    def add_round(self, section_id, section_name, round):
+        self.section_index.append(self.add_section(section_id, section_name))
+        self.id.append(round['id'])
+        self.start_meter.append(round['start_meter'])
+        self.end_meter.append(round['end_meter'])
+        self.start_minute.append(datetime_string_to_minutes(round['start_datetime']))
+        self.end_minute.append(datetime_string_to_minutes(round['end_datetime']))
+        self.cross_section_type.append(self.texts.add(round['cross_section_type']))
+        self.comment.append(self.texts.add(round['comment']))
+        self.duration.append(self.texts.add(round['duration']))
+        for material in round['material']:
+            self.material_name.append(self.material_names.add(material['name']))
+            self.material_unit.append(self.material_units.add(material['value_type']))
+            self.material_value.append(material['value'])
+        self.material_offset.append(len(self.material_value))
+
+    def get_round(self, index):
+        return {
+            'id': self.id[index],
+            'start_meter': self.start_meter[index],
+            'end_meter': self.end_meter[index],
+            'cross_section_type': self.texts[self.cross_section_type[index]],
+            'comment': self.texts[self.comment[index]],
+            'start_datetime': minutes_to_datetime_string(self.start_minute[index]),
+            'end_datetime': minutes_to_datetime_string(self.end_minute[index]),
+            'duration': self.texts[self.duration[index]],
+            'material': self.get_round_material(index),
+        }
+
+    def get_round_material(self, index):
+        material = []
+        for i in range(self.material_offset[index], self.material_offset[index + 1]):
+            material.append({
+                'name': self.material_names[self.material_name[i]],
+                'value_type': self.material_units[self.material_unit[i]],
+                'value': self.material_value[i],
+            })
+        return material
+
+    def get_round_indexes(self):
+        return {round_id: index for index, round_id in enumerate(self.id)}
+
+    def get_end_minute_high_water_marks(self):
+        """Returns the latest round end per section id, in minutes."""
+        high_water_marks = {}
+        for section_index, end_minute in zip(self.section_index, self.end_minute):
+            section_id = self.sections[section_index][0]
+            high_water_marks[section_id] = max(end_minute, high_water_marks.get(section_id, end_minute))
+        return high_water_marks
+
+    def __len__(self):
+        return len(self.id)
+
+    @classmethod
+    def from_snapshot(cls, data):
+        table = cls()
+        for section in data['sections']:
+            table.add_section(section['id'], section['name'])
+            for round in section['rounds']:
+                table.add_round(section['id'], section['name'], round)
+        return table
+
+    @classmethod
+    def from_rounds(cls, section_rounds):
+        """Builds a table from (section, round) pairs such as snapshot.iterate_rounds yields."""
+        table = cls()
+        for section, round in section_rounds:
+            table.add_round(section['id'], section['name'], round)
+        return table
+
+    def to_snapshot(self):
+        sections = [{'id': section_id, 'name': section_name, 'rounds': []} for section_id, section_name in self.sections]
+        for index in range(len(self)):
+            sections[self.section_index[index]]['rounds'].append(self.get_round(index))
+        return {'sections': sections}
+
+
+def datetime_string_to_minutes(value):
+    date, time = value.split(' ')
+    day, month, year = date.split('.')
+    hour, minute = time.split(':')
+    delta = datetime.datetime(int(year), int(month), int(day), int(hour), int(minute)) - EPOCH
+    return delta.days * 24 * 60 + delta.seconds // 60
+
+
+def minutes_to_datetime_string(minutes):
+    value = EPOCH + datetime.timedelta(minutes=minutes)
+    # Matches convert_tims_datetime_object_to_string, which does not zero-pad
+    return "{}.{}.{} {}:{}".format(value.day, value.month, value.year, value.hour, value.minute)
@@ -1,44 +1,90 @@
 #! python3
 
-import requests
-import credentials
+from tims_client import TimsClient, DEFAULT_BASE_URL
+from response_cache import ResponseCache
 from round import Round
-from cross_section import CrossSection
+from cross_section import get_cross_section
 from section import Section
+from round_filter import NO_FILTER
 from material import Material
-import json
+from round_table import RoundTable, datetime_string_to_minutes
+import snapshot
+import snapshot_store
+import material_rollup
+from instrumentation import Instrumentation, create_report_name
 import datetime
 import os
 
 
-def authenticate():
-    response = requests.post("https://tunnel.big.tuwien.ac.at:8000/api/login/",
-                             json={"user": credentials.username, "password": credentials.password})
-    access_token = "Bearer " + response.text
-    headers = {"Authorization": access_token}
-    return headers
+MAX_CONCURRENT_REQUESTS = 8
+# Bulk mode loads material per section instead of per round
+BULK_MODE = True
+IN_QUERY_CHUNK_SIZE = 200
+# Incremental sync merges into the newest stored snapshot and only refetches new or changed rounds
+INCREMENTAL_SYNC = True
+SNAPSHOT_TIMESTAMP_FORMAT = "%d%m%Y_%H%M%S"
+# SQLite upserts every load into one indexed store, data/tims.sqlite; NDJSON snapshots are written round by round
+# as they arrive and JSON writes a single document, both into a new timestamped file per load
+SNAPSHOT_EXTENSION = snapshot_store.SQLITE_EXTENSION
+# Stores are also exported to an NDJSON snapshot of the same name next to them, data/tims.ndjson, replaced after
+# every load, for generator engines without SQLite and for picking a snapshot by hand
+STORE_SNAPSHOT = True
+# Responses are cached in data/cache; seconds each endpoint is served without revalidation
+RESPONSE_CACHE = True
+RESPONSE_CACHE_OFFLINE = False
+RESPONSE_CACHE_MAX_SIZE_BYTES = 200 * 1024 * 1024
+RESPONSE_CACHE_TTLS = {
+    'construction.section': 24 * 60 * 60,
+    'construction.tunnel.round': 0,
+    'construction.activity': 60 * 60,
+    'construction.tunnel.measure': 60 * 60,
+}
+# Stage timings and request counts, written to data/reports at the end of a run
+INSTRUMENTATION = True
+# Material totals and per-metre rates per section and per chainage bin of this many meters, written to data/reports
+# after every load
+MATERIAL_ROLLUP = True
+MATERIAL_ROLLUP_BIN_METER = 10.0
 
 
-def get_sections():
-    response = requests.get("https://tunnel.big.tuwien.ac.at:8000/api/construction.section/", headers=headers)
+def create_client(base_url=DEFAULT_BASE_URL, username=None, password=None, cache_directory=None,
+                  offline=RESPONSE_CACHE_OFFLINE):
+    cache = None
+    if RESPONSE_CACHE:
+        cache = ResponseCache(cache_directory or os.path.join(get_data_directory(), 'cache'), RESPONSE_CACHE_TTLS,
+                              max_size_bytes=RESPONSE_CACHE_MAX_SIZE_BYTES, offline=offline)
+    client = TimsClient(base_url, max_workers=MAX_CONCURRENT_REQUESTS, cache=cache, instrumentation=instrumentation)
+    if username is None:
+        # The pushbutton reads the login from the gitignored credentials module next to it
+        import credentials
+        username, password = credentials.username, credentials.password
+    client.authenticate(username, password)
+    return client
+
+
+def get_sections(client, round_filter=NO_FILTER):
     sections = []
-    for item in response.json():
+    for item in client.get("construction.section", round_filter.get_section_query()):
         section = Section(item['id'], item['name'])
         sections.append(section)
     return sections
 
 
-def get_rounds(section_id):
-    response = requests.get(
-        "https://tunnel.big.tuwien.ac.at:8000/api/construction.tunnel.round/?q=[[\"section\", \"=\", {}]]".format(
-            section_id), headers=headers)
+def get_rounds(client, section_id, round_filter=NO_FILTER):
     rounds = []
-    for item in response.json():
+    for item in client.get("construction.tunnel.round", round_filter.get_round_query(section_id)):
         if item['comment'] is None:
             item['comment'] = ''
         start_datetime = convert_tims_datetime_object_to_string(item['start_time'])
         end_datetime = convert_tims_datetime_object_to_string(item['end_time'])
-        round = Round(item['id'], item['start_chainage'], item['end_chainage'], 'Kalotte', item['comment'],
+        cross_section_value = item.get('cross_section.', item.get('cross_section'))
+        cross_section = get_cross_section(cross_section_value)
+        if cross_section is None:
+            # No as-built family to generate it in, the rest of the load goes on
+            print("Skipping round {} of unknown cross section {}".format(item['id'], cross_section_value))
+            instrumentation.count('skipped_rounds')
+            continue
+        round = Round(item['id'], item['start_chainage'], item['end_chainage'], cross_section.label, item['comment'],
                       start_datetime, end_datetime, str(item['duration']) + 'h')
         rounds.append(round)
     return rounds
@@ -48,63 +94,240 @@ def convert_tims_datetime_object_to_string(object):
     return "{}.{}.{} {}:{}".format(object['day'], object['month'], object['year'], object['hour'], object['minute'])
 
 
-def get_material(round_id):
-    round_activity_ids = get_round_activity_ids(round_id)
-    response = requests.get(
-        "https://tunnel.big.tuwien.ac.at:8000/api/construction.tunnel.measure/?q=[[\"activity\", \"in\", {}]]".format(
-            round_activity_ids), headers=headers)
+def get_material(client, round_id):
+    round_activity_ids = get_round_activity_ids(client, round_id)
     materials = []
-    for item in response.json():
-        material = Material(item['measure_definition.']['name'], item['uom.']['name'], item['quantity'])
-        materials.append(material)
+    for item in client.get("construction.tunnel.measure", [["activity", "in", round_activity_ids]]):
+        materials.append(create_material(item))
+    return materials
+
+
+def get_section_material(client, round_ids):
+    activity_round_ids = {}
+    for item in client.get_in("construction.activity", "round", round_ids, IN_QUERY_CHUNK_SIZE):
+        activity_round_ids[item['id']] = item['round']
+    materials = {round_id: [] for round_id in round_ids}
+    for item in client.get_in("construction.tunnel.measure", "activity", list(activity_round_ids),
+                              IN_QUERY_CHUNK_SIZE):
+        materials[activity_round_ids[item['activity']]].append(create_material(item))
     return materials
 
 
-def get_round_activity_ids(round_id):
-    response = requests.get(
-        "https://tunnel.big.tuwien.ac.at:8000/api/construction.activity/?q=[[\"round\",\"=\",{}]]".format(round_id),
-        headers=headers)
+def create_material(item):
+    return Material(item['measure_definition.']['name'], item['uom.']['name'], item['quantity'])
+
+
+def get_round_activity_ids(client, round_id):
     activity_ids = []
-    for item in response.json():
+    for item in client.get("construction.activity", [["round", "=", round_id]]):
         activity_ids.append(item['id'])
     return activity_ids
 
 
-def get_data():
-    sections = get_sections()
+def get_data(client, round_filter=NO_FILTER):
+    sections = get_sections(client, round_filter)
     for section in sections:
-        rounds = get_rounds(section.id)
+        section.rounds = (serialize_data(get_section_rounds(client, section.id, round_filter)))
+    return {"sections": serialize_data(sections)}
+
+
+def stream_data(client, snapshot_writer, round_filter=NO_FILTER):
+    for section in get_sections(client, round_filter):
+        for round in get_section_rounds(client, section.id, round_filter):
+            snapshot_writer.write_round(section.id, section.name, round.to_dict())
+
+
+def get_section_rounds(client, section_id, round_filter=NO_FILTER):
+    with instrumentation.span('get_rounds'):
+        rounds = get_rounds(client, section_id, round_filter)
+    rounds = sorted(rounds, key=lambda x: x.start_meter)
+    with instrumentation.span('get_rounds_material'):
+        rounds_material = get_rounds_material(client, rounds)
+    for round, round_material in zip(rounds, rounds_material):
+        round.material = serialize_data(round_material)
+    instrumentation.count('rounds', len(rounds))
+    return rounds
+
+
+def sync_data(client, previous_rounds, changed_only=False):
+    """Refetches new or changed rounds, the others keep their previous material.
+
+    Returns every round, or with changed_only only the refetched ones for stores that upsert them.
+    """
+    previous_round_indexes = previous_rounds.get_round_indexes()
+    high_water_marks = previous_rounds.get_end_minute_high_water_marks()
+    sections = get_sections(client)
+    refreshed_rounds_count = 0
+    for section in sections:
+        high_water_mark = high_water_marks.get(section.id)
+        with instrumentation.span('get_rounds'):
+            rounds = get_rounds(client, section.id)
         rounds = sorted(rounds, key=lambda x: x.start_meter)
+        changed_rounds = []
         for round in rounds:
-            round_material = get_material(round.id)
+            previous_round = None
+            if round.id in previous_round_indexes:
+                previous_round = previous_rounds.get_round(previous_round_indexes[round.id])
+            if is_round_changed(round, previous_round, high_water_mark):
+                changed_rounds.append(round)
+            else:
+                round.material = previous_round['material']
+        with instrumentation.span('get_rounds_material'):
+            rounds_material = get_rounds_material(client, changed_rounds)
+        for round, round_material in zip(changed_rounds, rounds_material):
             round.material = serialize_data(round_material)
-        section.rounds = (serialize_data(rounds))
+        refreshed_rounds_count += len(changed_rounds)
+        instrumentation.count('rounds', len(rounds))
+        section.rounds = (serialize_data(changed_rounds if changed_only else rounds))
+    instrumentation.set_counter('refreshed_rounds', refreshed_rounds_count)
+    print("Refreshed {} new or changed rounds".format(refreshed_rounds_count))
     return {"sections": serialize_data(sections)}
 
 
+def is_round_changed(round, previous_round, high_water_mark):
+    if previous_round is None:
+        return True
+    for key, value in round.to_dict().items():
+        if key != 'material' and previous_round.get(key) != value:
+            return True
+    # The latest stored round may still have been receiving measures when the snapshot was taken
+    return high_water_mark is None or datetime_string_to_minutes(round.end_datetime) >= high_water_mark
+
+
+def get_rounds_material(client, rounds):
+    if BULK_MODE:
+        section_material = get_section_material(client, [round.id for round in rounds])
+        return [section_material[round.id] for round in rounds]
+    return client.map(lambda round: get_material(client, round.id), rounds)
+
+
 def serialize_data(data_list):
     result = []
     for item in data_list:
-        result.append(vars(item))
+        result.append(item.to_dict())
     return result
 
 
-def store_data(data):
-    file_path = create_file_path()
-    with open(file_path, 'w') as f:
-        json.dump(data, f, ensure_ascii=True)
-        print("Data was successfully stored!")
+def load_latest_snapshot(data_directory=None):
+    snapshot_paths = []
+    data_directory = data_directory or get_data_directory()
+    if os.path.isdir(data_directory):
+        for file_name in os.listdir(data_directory):
+            timestamp = parse_snapshot_timestamp(file_name)
+            if timestamp is not None:
+                snapshot_paths.append((timestamp, os.path.join(data_directory, file_name)))
+    if not snapshot_paths:
+        return None
+    return RoundTable.from_rounds(snapshot.iterate_rounds(max(snapshot_paths)[1]))
 
 
-def create_file_path():
+def parse_snapshot_timestamp(file_name):
+    name, extension = os.path.splitext(file_name)
+    if not name.startswith('tims') or extension not in (snapshot.JSON_EXTENSION, snapshot.NDJSON_EXTENSION):
+        return None
+    try:
+        return datetime.datetime.strptime(name[len('tims'):], SNAPSHOT_TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+
+
+def store_data(data, file_path=None):
+    file_path = file_path or create_file_path()
+    if file_path.endswith(snapshot.NDJSON_EXTENSION):
+        with snapshot.SnapshotWriter(file_path) as snapshot_writer:
+            snapshot_writer.write_data(data)
+    else:
+        snapshot.write_document(file_path, data)
+    print("Data was successfully stored!")
+
+
+def stream_and_store_data(client, file_path=None, round_filter=NO_FILTER):
+    with snapshot.SnapshotWriter(file_path or create_file_path()) as snapshot_writer:
+        stream_data(client, snapshot_writer, round_filter)
+    print("Data was successfully stored!")
+
+
+def upsert_data(client, store, round_filter=NO_FILTER):
+    # Filtered downloads are upserted as they are, rounds outside the filter stay in the store
+    if INCREMENTAL_SYNC and round_filter.is_empty() and len(store) > 0:
+        with instrumentation.span('sync_data'):
+            data = sync_data(client, RoundTable.from_rounds(store.iterate_rounds()), changed_only=True)
+        with instrumentation.span('store_data'):
+            store.write_data(data)
+    else:
+        with instrumentation.span('stream_and_store_data'):
+            stream_data(client, store, round_filter)
+    print("Data was successfully stored!")
+
+
+def load_and_store_data(client, file_path=None, round_filter=NO_FILTER):
+    file_path = file_path or create_file_path()
+    if file_path.endswith(snapshot_store.SQLITE_EXTENSION):
+        with snapshot_store.SnapshotStore(file_path) as store:
+            upsert_data(client, store, round_filter)
+            if STORE_SNAPSHOT:
+                with instrumentation.span('export_snapshot'):
+                    store.export_snapshot(os.path.splitext(file_path)[0] + snapshot.NDJSON_EXTENSION)
+        return file_path
+    # Filtered downloads are partial, merging them into the previous snapshot would drop every other round
+    previous_rounds = None
+    if INCREMENTAL_SYNC and round_filter.is_empty():
+        previous_rounds = load_latest_snapshot(os.path.dirname(os.path.abspath(file_path)))
+    if previous_rounds is not None:
+        with instrumentation.span('sync_data'):
+            data = sync_data(client, previous_rounds)
+        with instrumentation.span('store_data'):
+            store_data(data, file_path)
+    elif file_path.endswith(snapshot.NDJSON_EXTENSION):
+        with instrumentation.span('stream_and_store_data'):
+            stream_and_store_data(client, file_path, round_filter)
+    else:
+        with instrumentation.span('get_data'):
+            data = get_data(client, round_filter)
+        with instrumentation.span('store_data'):
+            store_data(data, file_path)
+    return file_path
+
+
+def create_file_path(directory=None):
+    if SNAPSHOT_EXTENSION == snapshot_store.SQLITE_EXTENSION:
+        return os.path.join(directory or get_data_directory(), 'tims' + SNAPSHOT_EXTENSION)
+    return create_snapshot_path(directory, SNAPSHOT_EXTENSION)
+
+
+def create_snapshot_path(directory=None, extension=SNAPSHOT_EXTENSION):
+    return os.path.join(directory or get_data_directory(), 'tims' + get_current_timestamp() + extension)
+
+
+def write_material_rollup(file_path, directory=None, round_filter=NO_FILTER, bin_meter=MATERIAL_ROLLUP_BIN_METER):
+    """Rolls up the measures of a store or snapshot file, returns the JSON report path.
+
+    Stores are queried by the whole filter, snapshot files only by its chainage range.
+    """
+    if file_path.endswith(snapshot_store.SQLITE_EXTENSION):
+        section_rounds = snapshot_store.iterate_rounds(file_path, section_ids=round_filter.section_ids,
+                                                       start_meter=round_filter.start_meter,
+                                                       end_meter=round_filter.end_meter,
+                                                       start_time=round_filter.start_time,
+                                                       end_time=round_filter.end_time)
+    else:
+        section_rounds = snapshot.iterate_rounds(file_path)
+    with instrumentation.span('material_rollup'):
+        rollup = material_rollup.MaterialRollup(section_rounds)
+        return rollup.write_report(directory or os.path.join(get_data_directory(), 'reports'),
+                                   create_report_name('material_rollup'), bin_meter, round_filter.start_meter,
+                                   round_filter.end_meter)
+
+
+def get_data_directory():
     absolute_path_of_script = os.path.dirname(__file__)
     absolute_file_path = get_parent_dir(get_parent_dir(get_parent_dir(absolute_path_of_script)))
-    return absolute_file_path + '\\data\\tims' + get_current_timestamp() + '.json'
+    return os.path.join(absolute_file_path, 'data')
 
 
 def get_current_timestamp():
     current_datetime = datetime.datetime.now()
-    timestamp_string = current_datetime.strftime("%d%m%Y_%H%M%S")
+    timestamp_string = current_datetime.strftime(SNAPSHOT_TIMESTAMP_FORMAT)
     return timestamp_string
 
 
@@ -112,6 +335,31 @@ def get_parent_dir(directory):
     return os.path.dirname(directory)
 
 
-headers = authenticate()
-data = get_data()
-store_data(data)
+def report_instrumentation(client):
+    if client.cache is not None:
+        instrumentation.set_counter('cache_hits', client.cache.hits)
+        instrumentation.set_counter('cache_revalidations', client.cache.revalidations)
+        instrumentation.set_counter('cache_misses', client.cache.misses)
+    report_path = instrumentation.write_report(os.path.join(get_data_directory(), 'reports'),
+                                               create_report_name('loader'))
+    if report_path is not None:
+        print(instrumentation.summary())
+        print("Profile written to " + report_path)
+
+
+instrumentation = Instrumentation(INSTRUMENTATION)
+
+if __name__ == '__main__':
+    client = create_client()
+    try:
+        file_path = load_and_store_data(client)
+        if MATERIAL_ROLLUP:
+            if material_rollup.is_available():
+                print("Material rollup written to " + write_material_rollup(file_path))
+            else:
+                print("NumPy is not available, the material rollup is left out")
+    finally:
+        client.close()
+        if client.cache is not None:
+            print(client.cache.summary())
+        report_instrumentation(client)
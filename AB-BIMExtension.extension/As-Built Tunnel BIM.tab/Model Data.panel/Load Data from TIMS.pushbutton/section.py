@@ -1,6 +1,10 @@
 class Section:
+    __slots__ = ('id', 'name', 'rounds')
+
     def __init__(self, id, name):
         self.id = id
         self.name = name
         self.rounds = []
 
+    def to_dict(self):
+        return {'id': self.id, 'name': self.name, 'rounds': self.rounds}
@@ -0,0 +1,89 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from instrumentation import Instrumentation
+from response_cache import CacheMissException
+
+
+DEFAULT_BASE_URL = "https://tunnel.big.tuwien.ac.at:8000/api/"
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_IN_CHUNK_SIZE = 200
+
+
+class TimsClient:
+    """Thin TIMS API client sharing one keep-alive session between worker threads."""
+
+    def __init__(self, base_url=DEFAULT_BASE_URL, max_workers=DEFAULT_MAX_WORKERS, cache=None, instrumentation=None):
+        self.base_url = base_url.rstrip('/') + '/'
+        self.cache = cache
+        self.instrumentation = instrumentation or Instrumentation(False)
+        self.max_workers = max(1, max_workers)
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def authenticate(self, username, password):
+        if self.cache is not None and self.cache.offline:
+            return
+        response = self.session.post(self.base_url + "login/", json={"user": username, "password": password})
+        response.raise_for_status()
+        self.session.headers["Authorization"] = "Bearer " + response.text
+
+    def get(self, endpoint, query=None):
+        url = self.base_url + endpoint + "/"
+        if query is not None:
+            url += "?q=" + json.dumps(query)
+        if self.cache is None:
+            response = self._send(url)
+            response.raise_for_status()
+            return response.json()
+        return json.loads(self._get_cached(endpoint, url).decode('utf-8'))
+
+    def _get_cached(self, endpoint, url):
+        cached, is_fresh = self.cache.lookup(endpoint, url)
+        if is_fresh:
+            return cached.body
+        if self.cache.offline:
+            raise CacheMissException("Response not cached, cannot load it in offline mode", url)
+        headers = cached.validation_headers() if cached is not None else {}
+        response = self._send(url, headers)
+        if cached is not None and response.status_code == 304:
+            self.cache.refresh(cached)
+            return cached.body
+        response.raise_for_status()
+        self.cache.store(endpoint, url, response.content, response.headers.get('ETag'),
+                         response.headers.get('Last-Modified'))
+        return response.content
+
+    def _send(self, url, headers=None):
+        with self.instrumentation.span('http_request'):
+            response = self.session.get(url, headers=headers)
+        self.instrumentation.count('http_requests')
+        self.instrumentation.count('http_bytes', len(response.content))
+        return response
+
+    def get_in(self, endpoint, field, values, chunk_size=DEFAULT_IN_CHUNK_SIZE):
+        """Queries endpoint with ["field", "in", values], split into chunks to keep the URLs short."""
+        values = list(values)
+        chunks = [values[i:i + chunk_size] for i in range(0, len(values), chunk_size)]
+        items = []
+        for chunk_items in self.map(lambda chunk: self.get(endpoint, [[field, "in", chunk]]), chunks):
+            items.extend(chunk_items)
+        return items
+
+    def map(self, function, items):
+        """Applies function to every item using at most max_workers concurrent requests, keeping input order."""
+        items = list(items)
+        if self.max_workers == 1 or len(items) < 2:
+            return [function(item) for item in items]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            return list(executor.map(function, items))
+
+    def close(self):
+        self.session.close()
+        if self.cache is not None:
+            self.cache.save()
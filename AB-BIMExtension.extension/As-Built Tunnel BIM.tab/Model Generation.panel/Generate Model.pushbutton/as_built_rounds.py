@@ -0,0 +1,109 @@
+import json
+import os
+
+
+JOURNAL_SUFFIX = '.journal'
+TEMPORARY_SUFFIX = '.tmp'
+
+
+class RoundCheckpoint:
+    """Fingerprints of the round plans last applied to each document.
+
+    Every batch appends its fingerprints to a journal next to the JSON file, one line per batch, and compact folds
+    the journal into the JSON file at the end of a run. A run that stopped early leaves its journal to the next one.
+    """
+
+    def __init__(self, file_path, document_key):
+        self.file_path = file_path
+        self.journal_path = file_path + JOURNAL_SUFFIX
+        self.document_key = document_key
+        try:
+            with open(file_path, 'r') as f:
+                self._documents = json.load(f)
+        except (IOError, OSError, ValueError):
+            self._documents = {}
+        self._replay_journal()
+
+    def get(self, round_key):
+        return self._documents.get(self.document_key, {}).get(round_key)
+
+    def update(self, fingerprints):
+        """Records the fingerprints of a committed batch in memory and in the journal."""
+        if not fingerprints:
+            return
+        self._documents.setdefault(self.document_key, {}).update(fingerprints)
+        directory = os.path.dirname(self.file_path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        with open(self.journal_path, 'a') as f:
+            f.write(json.dumps([self.document_key, fingerprints]) + '\n')
+
+    def compact(self):
+        """Writes every fingerprint to the JSON file and empties the journal."""
+        if not os.path.isfile(self.journal_path):
+            return
+        temporary_path = self.file_path + TEMPORARY_SUFFIX
+        with open(temporary_path, 'w') as f:
+            json.dump(self._documents, f)
+        replace_file(temporary_path, self.file_path)
+        os.remove(self.journal_path)
+
+    def _replay_journal(self):
+        try:
+            with open(self.journal_path, 'r') as f:
+                for line in f:
+                    document_key, fingerprints = json.loads(line)
+                    self._documents.setdefault(document_key, {}).update(fingerprints)
+        except (IOError, OSError, ValueError):
+            # No journal, or one ending in the line of a batch interrupted while writing, the batches before it count
+            pass
+
+
+class AsBuiltRounds:
+    """As-built blocks already in the model by their round tag, used to skip, update or create each planned round."""
+
+    def __init__(self, checkpoint):
+        self.checkpoint = checkpoint
+        self.created = 0
+        self.updated = 0
+        self.unchanged = 0
+        self._elements = {}
+        # Fingerprints of rounds applied in the open transaction
+        self._pending = {}
+
+    def add_element(self, round_key, element):
+        # A duplicate from an earlier interrupted run keeps the first block
+        self._elements.setdefault(round_key, element)
+
+    def get_element(self, round_key):
+        return self._elements.get(round_key)
+
+    def is_current(self, round_key, fingerprint):
+        """Whether the block of the round exists and was last built from an identical plan."""
+        return round_key in self._elements and self.checkpoint.get(round_key) == fingerprint
+
+    def record(self, round_key, fingerprint):
+        self._pending[round_key] = fingerprint
+
+    def commit(self):
+        self.checkpoint.update(self._pending)
+        self._pending = {}
+
+    def discard(self):
+        self._pending = {}
+
+    def summary(self):
+        return 'Rounds: {} created, {} updated, {} unchanged'.format(self.created, self.updated, self.unchanged)
+
+    def __len__(self):
+        return len(self._elements)
+
+
+def replace_file(source_path, target_path):
+    if hasattr(os, 'replace'):
+        os.replace(source_path, target_path)
+        return
+    # IronPython 2.7 has no os.replace and its os.rename does not overwrite
+    if os.path.exists(target_path):
+        os.remove(target_path)
+    os.rename(source_path, target_path)
@@ -0,0 +1,57 @@
+import bisect
+
+
+class ChainageIndex:
+    """Chainage intervals sorted by start, answering point queries with bisect."""
+
+    def __init__(self, entries):
+        # Entries are (order, element, type_name, start_meter, end_meter) tuples
+        self._entries = sorted(entries, key=lambda entry: entry[3])
+        self._starts = [entry[3] for entry in self._entries]
+        self._max_length = max([entry[4] - entry[3] for entry in self._entries] or [0])
+
+    def find_containing(self, position):
+        """Returns entries whose interval includes position, bounds included."""
+        first = bisect.bisect_left(self._starts, position - self._max_length)
+        last = bisect.bisect_right(self._starts, position)
+        return [entry for entry in self._entries[first:last] if entry[4] >= position]
+
+    def find_overlapping(self, start_meter, end_meter):
+        """Returns entries overlapping the range the way element_overlap does, in collector order."""
+        entries = {}
+        for entry in self.find_containing(start_meter) + self.find_containing(end_meter):
+            entries[entry[0]] = entry
+        return [entries[order] for order in sorted(entries)]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AsDesignedIndex:
+    """As-designed elements by Blocknummer chainage, overall and grouped by family name."""
+
+    def __init__(self, elements):
+        # Elements are (element, type_name, start_meter, end_meter, family_name) tuples in collector order
+        entries = [(order,) + tuple(element) for order, element in enumerate(elements)]
+        self._index = ChainageIndex(entries)
+        self._family_indexes = group_entries(entries, 5)
+
+    def find_element_name(self, start_meter, end_meter, family_name=None):
+        """Type name of the first element overlapping the range, only among elements of family_name if given."""
+        index = self._index if family_name is None else self._family_indexes.get(family_name)
+        if index is None:
+            return None
+        entries = index.find_overlapping(start_meter, end_meter)
+        if entries:
+            return entries[0][2]
+        return None
+
+    def __len__(self):
+        return len(self._index)
+
+
+def group_entries(entries, position):
+    entries_by_key = {}
+    for entry in entries:
+        entries_by_key.setdefault(entry[position], []).append(entry)
+    return dict((key, ChainageIndex(key_entries)) for key, key_entries in entries_by_key.items())
@@ -0,0 +1,55 @@
+import json
+import os
+
+
+class DocumentCache:
+    """Values derived from Revit documents, persisted as JSON and dropped once a document's version changes."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        try:
+            with open(file_path, 'r') as f:
+                self._documents = json.load(f)
+        except (IOError, OSError, ValueError):
+            self._documents = {}
+        # Saving is skipped while nothing differs from the file
+        self._changed = False
+
+    def get(self, document_key, version, name, default=None):
+        entry = self._documents.get(document_key)
+        if version is None or entry is None or entry['version'] != version:
+            return default
+        return entry['values'].get(name, default)
+
+    def set(self, document_key, version, name, value):
+        if version is None:
+            return
+        entry = self._documents.get(document_key)
+        if entry is None or entry['version'] != version:
+            entry = {'version': version, 'values': {}}
+            self._documents[document_key] = entry
+            self._changed = True
+        if entry['values'].get(name) != value:
+            entry['values'][name] = value
+            self._changed = True
+
+    def set_version(self, document_key, version, new_version):
+        """Keeps the values cached for version valid at new_version, after changes known not to affect them."""
+        entry = self._documents.get(document_key)
+        if entry is None or version is None or new_version is None or entry['version'] != version:
+            return
+        if new_version != version:
+            entry['version'] = new_version
+            self._changed = True
+
+    def save(self):
+        if not self._changed:
+            return
+        directory = os.path.dirname(self.file_path)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        # Encoded at once, json.dump writes large documents in many small chunks
+        content = json.dumps(self._documents)
+        with open(self.file_path, 'w') as f:
+            f.write(content)
+        self._changed = False
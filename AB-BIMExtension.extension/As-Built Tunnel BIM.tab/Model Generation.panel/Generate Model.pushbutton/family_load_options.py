@@ -0,0 +1,14 @@
+from Autodesk.Revit import DB
+
+
+class OverwriteFamilyLoadOptions(DB.IFamilyLoadOptions):
+    """Reloads an edited family over the loaded one, including its parameter values."""
+
+    def OnFamilyFound(self, familyInUse, overwriteParameterValues):
+        overwriteParameterValues.Value = True
+        return True
+
+    def OnSharedFamilyFound(self, sharedFamily, familyInUse, source, overwriteParameterValues):
+        source.Value = DB.FamilySource.Family
+        overwriteParameterValues.Value = True
+        return True
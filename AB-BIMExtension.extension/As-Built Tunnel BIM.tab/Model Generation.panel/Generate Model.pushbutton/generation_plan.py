@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import hashlib
+
+from as_designed_index import AsDesignedIndex
+from position_engine import PositionEngine, POSITION_PARAMETER_NAMES, WEIGHTED
+
+
+TEXT = 'text'
+MILLIMETER = 'millimeter'
+DEGREE = 'degree'
+
+POSITION_PARAMETER_UNITS = {
+    'Gradientenhöhe_A': MILLIMETER,
+    'Gradientenhöhe_B': MILLIMETER,
+    'Querneigung': DEGREE,
+    'rotXY_A': DEGREE,
+    'rotXY_B': DEGREE,
+}
+POSITION_PARAMETERS = [(name, POSITION_PARAMETER_UNITS[name]) for name in POSITION_PARAMETER_NAMES]
+# Identity parameter tagging each as-built block with the round it was generated from
+ROUND_TAG_PARAMETER = 'TIMS Runde'
+# Cross section of rounds from snapshots written before the loader read it from TIMS
+DEFAULT_CROSS_SECTION_TYPE = 'Kalotte'
+
+
+class RoundPlan(object):
+    """Everything needed to build one as-built round: family type, placement chainages and parameter values."""
+
+    # Every planned round is kept until the plan is applied, slots keep each one small
+    __slots__ = ['round_id', 'section_id', 'type_name', 'cross_section_type', 'family_name', 'start_meter',
+                 'end_meter', 'parameters', 'is_positioned']
+
+    def __init__(self, round_id, section_id, type_name, start_meter, end_meter, parameters,
+                 cross_section_type=DEFAULT_CROSS_SECTION_TYPE, family_name=None):
+        self.round_id = round_id
+        self.section_id = section_id
+        self.type_name = type_name
+        self.cross_section_type = cross_section_type
+        # As-built family the block is created in
+        self.family_name = family_name
+        self.start_meter = start_meter
+        self.end_meter = end_meter
+        # (name, value, unit) tuples in the order they are set
+        self.parameters = parameters
+        self.is_positioned = False
+
+    @property
+    def key(self):
+        # Rounds added by hand may come without a TIMS id
+        if self.round_id is not None:
+            return str(self.round_id)
+        return '{}-{}'.format(self.start_meter, self.end_meter)
+
+    def get_fingerprint(self):
+        return hashlib.sha1(repr([self.type_name] + self.parameters).encode('utf-8')).hexdigest()
+
+
+class GenerationPlan:
+    def __init__(self, as_designed_table, position_mode=WEIGHTED, cross_sections=None):
+        self.index = create_as_designed_index(as_designed_table)
+        self.position_engine = PositionEngine(as_designed_table, position_mode)
+        # Cross section types to generate mapped to their (as-designed family name, as-built family name),
+        # rounds of other cross sections are left out; None plans every round against the whole model
+        self.cross_sections = cross_sections
+        self.rounds = []
+        self.material_names = set()
+        # Parameter names by themselves, so all rounds share one copy of each name read from the snapshot
+        self.parameter_names = {}
+
+    def add_round(self, section, round):
+        """Plans the round, or returns None if its cross section is not generated."""
+        cross_section_type = round.get('cross_section_type') or DEFAULT_CROSS_SECTION_TYPE
+        as_designed_family_name, as_built_family_name = None, None
+        if self.cross_sections is not None:
+            if cross_section_type not in self.cross_sections:
+                return None
+            as_designed_family_name, as_built_family_name = self.cross_sections[cross_section_type]
+        self.material_names.update([item['name'] for item in round['material']])
+        type_name = self.index.find_element_name(round['start_meter'], round['end_meter'], as_designed_family_name)
+        parameters = [(self.parameter_names.setdefault(name, name), value, unit)
+                      for name, value, unit in plan_round_parameters(round)]
+        round_plan = RoundPlan(round.get('id'), section.get('id'), type_name, round['start_meter'],
+                               round['end_meter'], parameters, cross_section_type, as_built_family_name)
+        round_plan.parameters.insert(0, (ROUND_TAG_PARAMETER, round_plan.key, TEXT))
+        self.rounds.append(round_plan)
+        return round_plan
+
+    def add_summary_parameters(self, round_summaries):
+        """Adds the per-metre rate and cumulative quantity of MaterialRollup.get_round_summaries to each round."""
+        for round_plan in self.rounds:
+            for name, uom, quantity_per_meter, cumulative_quantity in round_summaries.get(round_plan.round_id, []):
+                summary_parameters = [
+                    (name + ' je m', str(round(quantity_per_meter, 3)) + ' ' + uom + '/m', TEXT),
+                    (name + ' kumuliert', str(round(cumulative_quantity, 3)) + ' ' + uom, TEXT),
+                ]
+                self.material_names.update([parameter[0] for parameter in summary_parameters])
+                round_plan.parameters.extend(summary_parameters)
+
+    def get_cross_section_types(self):
+        """Cross section types having planned rounds."""
+        return set([round_plan.cross_section_type for round_plan in self.rounds])
+
+    def plan_positions(self):
+        """Adds position parameters to all typed rounds, one pass per as-designed type."""
+        rounds_by_type = {}
+        for round_plan in self.rounds:
+            if round_plan.type_name is not None and not round_plan.is_positioned:
+                rounds_by_type.setdefault(round_plan.type_name, []).append(round_plan)
+        for type_name, round_plans in rounds_by_type.items():
+            self._add_position_parameters(type_name, round_plans)
+
+    def resolve_type(self, round_plan, type_name):
+        """Completes a round no as-designed element was found for, once its type name is known."""
+        round_plan.type_name = type_name
+        self._add_position_parameters(type_name, [round_plan])
+
+    def _add_position_parameters(self, type_name, round_plans):
+        positions = self.position_engine.compute(type_name, [round_plan.start_meter for round_plan in round_plans],
+                                                 [round_plan.end_meter for round_plan in round_plans])
+        for round_plan, values in zip(round_plans, positions):
+            round_plan.parameters.extend([(parameter_name, value, unit)
+                                          for (parameter_name, unit), value in zip(POSITION_PARAMETERS, values)])
+            round_plan.is_positioned = True
+
+
+def create_generation_plan(section_rounds, as_designed_table, position_mode=WEIGHTED, cross_sections=None):
+    """Plans every (section, round) pair against an exported as-designed element table."""
+    plan = GenerationPlan(as_designed_table, position_mode, cross_sections)
+    for section, round in section_rounds:
+        plan.add_round(section, round)
+    plan.plan_positions()
+    return plan
+
+
+def create_as_designed_index(as_designed_table):
+    # Block n spans chainage n - 1 to n
+    return AsDesignedIndex([(row, row['type'], row['Blocknummer'] - 1, row['Blocknummer'], row.get('family'))
+                            for row in as_designed_table])
+
+
+def plan_round_parameters(round):
+    parameters = [
+        ('Kommentar', round['comment'], TEXT),
+        ('Station Anfang', str(round['start_meter']) + 'm', TEXT),
+        ('Station Ende', str(round['end_meter']) + 'm', TEXT),
+        ('Zeit Anfang', round['start_datetime'], TEXT),
+        ('Zeit Ende', round['end_datetime'], TEXT),
+        ('Dauer', round['duration'], TEXT),
+    ]
+    for item in round['material']:
+        parameters.append((item['name'], str(item['value']) + ' ' + item['value_type'], TEXT))
+    return remove_overwritten_parameters(parameters)
+
+
+def remove_overwritten_parameters(parameters):
+    """Keeps the last value of parameters set more than once, e.g. a measure booked by several activities."""
+    last_indexes = dict((name, index) for index, (name, value, unit) in enumerate(parameters))
+    return [parameter for index, parameter in enumerate(parameters) if last_indexes[parameter[0]] == index]
+
@@ -0,0 +1,31 @@
+class ParameterCache:
+    """Name to parameter maps, built once per element and reused by every later lookup."""
+
+    def __init__(self):
+        self._parameters = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, element, parameter_name):
+        key = element.Id.IntegerValue
+        parameters = self._parameters.get(key)
+        if parameters is None:
+            self.misses += 1
+            parameters = {}
+            for p in element.Parameters:
+                # Keep the first parameter of a name, like the linear scan did
+                parameters.setdefault(p.Definition.Name, p)
+            self._parameters[key] = parameters
+        else:
+            self.hits += 1
+        return parameters.get(parameter_name)
+
+    def invalidate(self, element=None):
+        """Drops the map of one element, or all maps, e.g. after a family was reloaded."""
+        if element is None:
+            self._parameters.clear()
+        else:
+            self._parameters.pop(element.Id.IntegerValue, None)
+
+    def summary(self):
+        return 'Parameter lookups: {} served from cached maps, {} maps built'.format(self.hits, self.misses)
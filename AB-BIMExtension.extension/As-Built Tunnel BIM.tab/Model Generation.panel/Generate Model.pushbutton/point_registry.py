@@ -0,0 +1,44 @@
+class PointRegistry:
+    """Placement references along the tunnel curve by chainage, shared by rounds meeting within a tolerance."""
+
+    def __init__(self, create_point, tolerance_meter=0.001):
+        self.create_point = create_point
+        self.tolerance_meter = tolerance_meter
+        self.created = 0
+        self.reused = 0
+        self._points = {}
+
+    def get(self, position_meter):
+        point = self._find(position_meter)
+        if point is None:
+            return self._create(position_meter)
+        self.reused += 1
+        return point
+
+    def create_all(self, positions_meter):
+        """Creates the points of all given chainages in one pass, before any component is placed."""
+        for position_meter in sorted(positions_meter):
+            if self._find(position_meter) is None:
+                self._create(position_meter)
+
+    def summary(self):
+        return 'Placement points: {} created, {} placements served from existing points'.format(self.created,
+                                                                                                self.reused)
+
+    def _find(self, position_meter):
+        key = self._get_key(position_meter)
+        # Chainages within the tolerance can still fall into neighbouring buckets
+        for neighbour_key in (key, key - 1, key + 1):
+            entry = self._points.get(neighbour_key)
+            if entry is not None and abs(entry[0] - position_meter) <= self.tolerance_meter:
+                return entry[1]
+        return None
+
+    def _create(self, position_meter):
+        point = self.create_point(position_meter)
+        self._points[self._get_key(position_meter)] = (position_meter, point)
+        self.created += 1
+        return point
+
+    def _get_key(self, position_meter):
+        return int(round(position_meter / self.tolerance_meter))
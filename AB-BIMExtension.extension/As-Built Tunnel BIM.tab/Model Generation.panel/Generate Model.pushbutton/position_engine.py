@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+import bisect
+
+try:
+    import numpy
+except ImportError:
+    # IronPython, which runs the pushbutton inside Revit, has no NumPy
+    numpy = None
+
+
+POSITION_PARAMETER_NAMES = ['Gradientenhöhe_A', 'Gradientenhöhe_B', 'Querneigung', 'rotXY_A', 'rotXY_B']
+
+# Plain mean of the blocks element_overlap matches, as generation always did
+MEAN = 'mean'
+# Mean of the blocks intersecting the round, weighted by the length of the intersection
+WEIGHTED = 'weighted'
+
+
+class PositionEngine:
+    """Position parameters of as-designed blocks in chainage-sorted arrays per type, evaluated for many rounds at once."""
+
+    def __init__(self, as_designed_table, mode=WEIGHTED):
+        self.mode = mode
+        rows_by_type = {}
+        for row in as_designed_table:
+            rows_by_type.setdefault(row['type'], []).append(row)
+        self._types = {}
+        for type_name, rows in rows_by_type.items():
+            # Block n spans chainage n - 1 to n
+            rows = sorted(rows, key=lambda row: row['Blocknummer'])
+            starts = [row['Blocknummer'] - 1.0 for row in rows]
+            ends = [float(row['Blocknummer']) for row in rows]
+            values = [[row.get(name) for name in POSITION_PARAMETER_NAMES] for row in rows]
+            self._types[type_name] = BlockTable(starts, ends, values)
+
+    def compute(self, type_name, start_meters, end_meters):
+        """Returns one list of POSITION_PARAMETER_NAMES values per round; 0 where no block matches."""
+        blocks = self._types.get(type_name)
+        if blocks is None or len(blocks) == 0:
+            return [[0] * len(POSITION_PARAMETER_NAMES) for _ in start_meters]
+        if numpy is not None and len(start_meters) > 0:
+            return blocks.compute_vectorized(start_meters, end_meters, self.mode)
+        return [blocks.compute(start_meter, end_meter, self.mode)
+                for start_meter, end_meter in zip(start_meters, end_meters)]
+
+
+class BlockTable:
+    def __init__(self, starts, ends, values):
+        self.starts = starts
+        self.ends = ends
+        self.values = values
+        self.max_length = max([end - start for start, end in zip(starts, ends)] or [0])
+        if numpy is not None:
+            self._starts = numpy.array(starts, dtype=float)
+            self._ends = numpy.array(ends, dtype=float)
+            self._values = numpy.array([[numpy.nan if value is None else value for value in row] for row in values],
+                                       dtype=float).reshape(len(values), len(POSITION_PARAMETER_NAMES))
+
+    def __len__(self):
+        return len(self.starts)
+
+    def compute(self, start_meter, end_meter, mode):
+        # Rounds driven towards falling chainage end before they start
+        start_meter, end_meter = min(start_meter, end_meter), max(start_meter, end_meter)
+        first = bisect.bisect_left(self.starts, start_meter - self.max_length)
+        last = bisect.bisect_right(self.starts, end_meter)
+        weights = [0.0] * (last - first)
+        if mode == WEIGHTED:
+            for i in range(first, last):
+                weights[i - first] = max(0.0, min(self.ends[i], end_meter) - max(self.starts[i], start_meter))
+        if sum(weights) == 0:
+            for i in range(first, last):
+                if self._contains(i, start_meter) or self._contains(i, end_meter):
+                    weights[i - first] = 1.0
+        result = []
+        for parameter_index in range(len(POSITION_PARAMETER_NAMES)):
+            total = 0.0
+            total_weight = 0.0
+            for i in range(first, last):
+                value = self.values[i][parameter_index]
+                if value is not None and weights[i - first] > 0:
+                    total += value * weights[i - first]
+                    total_weight += weights[i - first]
+            result.append(total / total_weight if total_weight > 0 else 0)
+        return result
+
+    def compute_vectorized(self, start_meters, end_meters, mode):
+        start_meters = numpy.asarray(start_meters, dtype=float)
+        end_meters = numpy.asarray(end_meters, dtype=float)
+        round_starts = numpy.minimum(start_meters, end_meters)
+        round_ends = numpy.maximum(start_meters, end_meters)
+        first = numpy.searchsorted(self._starts, round_starts - self.max_length, side='left')
+        last = numpy.searchsorted(self._starts, round_ends, side='right')
+        # Candidate blocks of every round as a (rounds x candidates) matrix of block indexes
+        candidate_count = max(int((last - first).max()), 1)
+        indexes = first[:, None] + numpy.arange(candidate_count)[None, :]
+        is_candidate = indexes < last[:, None]
+        indexes = numpy.minimum(indexes, len(self) - 1)
+        block_starts = self._starts[indexes]
+        block_ends = self._ends[indexes]
+        contains_start = (block_starts <= round_starts[:, None]) & (round_starts[:, None] <= block_ends)
+        contains_end = (block_starts <= round_ends[:, None]) & (round_ends[:, None] <= block_ends)
+        overlap_weights = ((contains_start | contains_end) & is_candidate).astype(float)
+        if mode == WEIGHTED:
+            lengths = numpy.minimum(block_ends, round_ends[:, None]) - numpy.maximum(block_starts, round_starts[:, None])
+            length_weights = numpy.where(is_candidate, numpy.clip(lengths, 0, None), 0)
+            has_length = length_weights.sum(axis=1) > 0
+            overlap_weights = numpy.where(has_length[:, None], length_weights, overlap_weights)
+        values = self._values[indexes]
+        weights = numpy.where(numpy.isnan(values), 0, overlap_weights[:, :, None])
+        totals = (numpy.nan_to_num(values) * weights).sum(axis=1)
+        total_weights = weights.sum(axis=1)
+        result = numpy.where(total_weights > 0, totals / numpy.where(total_weights > 0, total_weights, 1), 0)
+        return result.tolist()
+
+    def _contains(self, index, position):
+        return self.starts[index] <= position <= self.ends[index]
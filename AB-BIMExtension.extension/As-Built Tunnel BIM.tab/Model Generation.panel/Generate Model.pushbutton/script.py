@@ -2,11 +2,24 @@
 from Autodesk.Revit import DB
 from Autodesk.Revit import UI
 from rpw import db
-from rpw.ui.forms import TextInput, Alert, SelectFromList
+from rpw.ui.forms import TextInput, Alert
 from not_found_exception import NotFoundException
+import generation_plan as GenerationPlanner
+from position_engine import MEAN, WEIGHTED
+from parameter_cache import ParameterCache
+from transaction_batch import TransactionBatch
+from document_cache import DocumentCache
+from point_registry import PointRegistry
+from as_built_rounds import AsBuiltRounds, RoundCheckpoint
+from family_load_options import OverwriteFamilyLoadOptions
 from pyrevit import forms
 from pyrevit import script
-import json
+import os
+import snapshot
+import snapshot_store
+import material_rollup
+import datetime
+from instrumentation import Instrumentation, REPORT_COLUMNS, create_report_name
 import utils as Utils
 
 
@@ -15,13 +28,72 @@ doc = __revit__.ActiveUIDocument.Document
 uiapp = __revit__.Application
 
 TUNNEL_AXIS_ELEMENT_TYPES = ['Autodesk.Revit.DB.CurveByPoints']
-
-
-def create_construction_family(new_family_name):
-    print('Creating construction family')
-    existing_family = locate_as_designed_family()
-    family_doc = doc.EditFamily(existing_family)
-    add_construction_parameters(family_doc)
+AS_BUILT_FAMILY_NAME = 'as-built'
+CROSS_SECTION_TYPES = ['Kalotte', 'Strosse', 'Sohle']
+# As-designed type each cross section is modelled with, its family is asked for when the model lacks the type
+AS_DESIGNED_TYPE_NAMES = {'Kalotte': 'EBO_K', 'Strosse': 'EBO_S', 'Sohle': 'EBO_So'}
+# As-built family the rounds of each cross section are generated in, copied from its as-designed family
+AS_BUILT_FAMILY_NAMES = {
+    'Kalotte': AS_BUILT_FAMILY_NAME,
+    'Strosse': AS_BUILT_FAMILY_NAME + ' Strosse',
+    'Sohle': AS_BUILT_FAMILY_NAME + ' Sohle',
+}
+# Sources offered when the loader's store, data/tims.sqlite, exists, snapshot files are picked by hand
+STORE_SOURCE = 'TIMS store'
+SNAPSHOT_FILE_SOURCE = 'Snapshot file'
+# Type parameter of the as-built family listing its parameters
+FAMILY_SCHEMA_PARAMETER = 'AB-BIM Schema'
+# Rounds whose elements and parameters are committed together in one transaction
+ROUNDS_PER_TRANSACTION = 50
+# WEIGHTED averages blocks by overlap length, MEAN keeps the plain average of overlapping blocks
+POSITION_MODE = WEIGHTED
+# Round boundaries closer than this share one placement point on the tunnel curve
+POINT_TOLERANCE_METER = 0.001
+# Numeric parameter values closer than this are left untouched when updating an existing round
+PARAMETER_TOLERANCE = 1e-9
+# Stage timings and API counts, written to data/reports at the end of a run
+INSTRUMENTATION = True
+# Measures whose per-metre rate and cumulative quantity along the section are added to each block, e.g.
+# ['Spritzbeton Kalotte und Strosse'], computed by lib/material_rollup.py and so only where NumPy is available
+SUMMARY_MEASURES = []
+# Reuses the as-designed table, symbol ids and tunnel curves of the last run while the document was neither saved
+# nor had elements added or deleted since, see Utils.get_document_fingerprint; turn off after editing Blocknummer or
+# position parameters in place without saving
+WARM_START = True
+
+
+def prepare_construction_families(as_designed_families, material_names):
+    """Prepares the as-built family of every cross section having planned rounds."""
+    planned_cross_section_types = generation_plan.get_cross_section_types()
+    for cross_section_type in CROSS_SECTION_TYPES:
+        if cross_section_type in planned_cross_section_types:
+            prepare_construction_family(AS_BUILT_FAMILY_NAMES[cross_section_type], material_names,
+                                        as_designed_families[cross_section_type])
+
+
+def prepare_construction_family(family_name, material_names, as_designed_family):
+    """Creates the as-built family, or adds the parameters it lacks, unless its schema already covers the data."""
+    parameters_tuples = load_construction_parameters(material_names)
+    as_built_family = get_as_built_family(family_name)
+    if as_built_family is None:
+        with instrumentation.span('create_construction_family'):
+            create_construction_family(family_name + '.rfa', parameters_tuples, as_designed_family)
+        with instrumentation.span('load_construction_family'):
+            load_construction_family(family_name + '.rfa')
+        return
+    family_schema = read_family_schema(as_built_family)
+    missing_parameter_names = [p[0] for p in parameters_tuples if p[0] not in family_schema]
+    if not missing_parameter_names:
+        print('Construction family ' + family_name + ' is up to date')
+        return
+    with instrumentation.span('update_construction_family'):
+        update_construction_family(as_built_family, parameters_tuples)
+
+
+def create_construction_family(new_family_name, parameters_tuples, as_designed_family):
+    print('Creating construction family ' + new_family_name)
+    family_doc = doc.EditFamily(as_designed_family)
+    add_construction_parameters(family_doc, parameters_tuples)
     options = DB.SaveAsOptions()
     options.OverwriteExistingFile = True
     try:
@@ -33,76 +105,142 @@ def create_construction_family(new_family_name):
         raise Exception("Couldn't create family due to Revit file permissions, please close the dialog and try again.")
 
 
-def locate_as_designed_family():
-    as_designed_element_name = TextInput('Loading As-designed Family', default='EBO_K',
-                                         description='Please enter the name of an used as-designed model.')
-    child_family_element = Utils.get_element(doc, as_designed_element_name)
-    return Utils.get_element_family(child_family_element)
+def update_construction_family(as_built_family, parameters_tuples):
+    print('Updating construction family')
+    family_doc = doc.EditFamily(as_built_family)
+    try:
+        add_construction_parameters(family_doc, parameters_tuples)
+        # Loaded straight from the edited document, the family file on disk is left as it is
+        family_doc.LoadFamily(doc, OverwriteFamilyLoadOptions())
+    except Exception as e:
+        raise Exception("Could not update construction family", e)
+    finally:
+        family_doc.Close(False)
+    parameter_cache.invalidate()
+    symbol_index.refresh()
 
 
-def add_construction_parameters(family_doc):
-    parameters_tuples = load_construction_parameters()
-    for p in parameters_tuples:
-        parameter_name = p[0]
-        parameter_type = p[1]
-        add_identity_parameter(family_doc, parameter_name, parameter_type)
-
-
-def load_construction_parameters():
-    return [
-        ('Selbstbohranker', DB.ParameterType.Text),
-        ('SN Mörtelanker', DB.ParameterType.Text),
-        ('Ortsbrustanker', DB.ParameterType.Text),
-        ('Baustahlgitter 1. Lage, ohne Bogen', DB.ParameterType.Text),
-        ('Baustahlgitter 1. Lage, mit Bogen', DB.ParameterType.Text),
-        ('Baustahlgitter 2. Lage, mit Bogen', DB.ParameterType.Text),
-        ('Rammspieß', DB.ParameterType.Text),
-        ('Selbstbohrspieß', DB.ParameterType.Text),
-        ('Spritzbeton Kalotte und Strosse', DB.ParameterType.Text),
-        ('Spritzbeton Ortsbrust', DB.ParameterType.Text),
-        ('Spritzbeton Teilflächen', DB.ParameterType.Text),
-        ('Bogen', DB.ParameterType.Text),
-        ('Verpressung', DB.ParameterType.Text),
-        ('Teilflächen', DB.ParameterType.Text),
-        ('Sprengstoff', DB.ParameterType.Text),
-        ('Kommentar', DB.ParameterType.Text),
-        ('Zeit Anfang', DB.ParameterType.Text),
-        ('Zeit Ende', DB.ParameterType.Text),
-        ('Dauer', DB.ParameterType.Text),
-    ]
+def get_as_built_family(family_name):
+    instrumentation.count('collector_scans')
+    for family in Utils.get_families():
+        if family.Name == family_name:
+            return family
+    return None
 
 
-def add_identity_parameter(family_doc, parameter_name, parameter_type):
+def read_family_schema(family):
+    for symbol_id in family.GetFamilySymbolIds():
+        p = doc.GetElement(symbol_id).LookupParameter(FAMILY_SCHEMA_PARAMETER)
+        if p is not None and p.AsString():
+            return set(p.AsString().split('\n'))
+    return set()
+
+
+def locate_as_designed_families(cross_section_types):
+    return dict((cross_section_type, locate_as_designed_family(cross_section_type))
+                for cross_section_type in cross_section_types)
+
+
+def locate_as_designed_family(cross_section_type):
+    as_designed_element_name = AS_DESIGNED_TYPE_NAMES[cross_section_type]
+    try:
+        child_family_element = Utils.get_element(symbol_index, as_designed_element_name)
+    except NotFoundException:
+        as_designed_element_name = TextInput('Loading As-designed Family of ' + cross_section_type,
+                                             default=as_designed_element_name,
+                                             description='Please enter the name of an used as-designed model.')
+        child_family_element = Utils.get_element(symbol_index, as_designed_element_name)
+    return Utils.get_element_family(child_family_element)
+
+
+def add_construction_parameters(family_doc, parameters_tuples):
     family_manager = family_doc.FamilyManager
+    existing_parameter_names = set([p.Definition.Name for p in family_manager.Parameters])
     family_doc_transaction = DB.Transaction(family_doc)
     try:
-        family_doc_transaction.Start("ADD PARAMETER")
-        family_manager.AddParameter(parameter_name, DB.BuiltInParameterGroup.PG_IDENTITY_DATA, parameter_type, True)
+        family_doc_transaction.Start("ADD PARAMETERS")
+        count_transactions()
+        for p in parameters_tuples:
+            parameter_name = p[0]
+            parameter_type = p[1]
+            if parameter_name not in existing_parameter_names:
+                add_identity_parameter(family_manager, parameter_name, parameter_type)
+        set_family_schema(family_manager)
         family_doc_transaction.Commit()
     except Exception as e:
-        print(e)
         family_doc_transaction.RollBack()
+        raise Exception("Couldn't add construction parameters", e)
+
+
+def load_construction_parameters(material_names):
+    parameters_tuples = [
+        ('Kommentar', DB.ParameterType.Text),
+        ('Zeit Anfang', DB.ParameterType.Text),
+        ('Zeit Ende', DB.ParameterType.Text),
+        ('Dauer', DB.ParameterType.Text),
+        (GenerationPlanner.ROUND_TAG_PARAMETER, DB.ParameterType.Text),
+    ]
+    # One parameter per material booked in the construction data
+    for material_name in sorted(material_names):
+        parameters_tuples.append((material_name, DB.ParameterType.Text))
+    return parameters_tuples
+
+
+def add_identity_parameter(family_manager, parameter_name, parameter_type, is_instance=True):
+    return family_manager.AddParameter(parameter_name, DB.BuiltInParameterGroup.PG_IDENTITY_DATA, parameter_type,
+                                       is_instance)
+
+
+def set_family_schema(family_manager):
+    """Records the names of all family parameters in a type parameter, readable without editing the family."""
+    schema_parameter = None
+    parameter_names = []
+    for p in family_manager.Parameters:
+        if p.Definition.Name == FAMILY_SCHEMA_PARAMETER:
+            schema_parameter = p
+        else:
+            parameter_names.append(p.Definition.Name)
+    if schema_parameter is None:
+        schema_parameter = add_identity_parameter(family_manager, FAMILY_SCHEMA_PARAMETER, DB.ParameterType.Text,
+                                                  False)
+    for family_type in family_manager.Types:
+        family_manager.CurrentType = family_type
+        family_manager.Set(schema_parameter, '\n'.join(sorted(parameter_names)))
 
 
 def load_construction_family(family_name):
     print('Loading construction family')
     try:
         transaction.Start('LOAD CONSTRUCTION FAMILY')
+        count_transactions()
         result = doc.LoadFamily(family_name)
         if not result:
             print('Family already loaded, using loaded family')
         transaction.Commit()
+        parameter_cache.invalidate()
+        symbol_index.refresh()
     except Exception as e:
         transaction.RollBack()
         raise Exception("Could not load family", e)
 
 
 def create_tunnel_curve():
+    cached_tunnel_curve = get_cached_element('as_built_tunnel_curve')
+    if cached_tunnel_curve is not None:
+        print('Using tunnel curve of the last run')
+        return cached_tunnel_curve
+    # Resumed runs attach their blocks to the curve the blocks of earlier runs sit on
+    existing_tunnel_curve = find_as_built_tunnel_curve()
+    if existing_tunnel_curve is not None:
+        print('Using tunnel curve of the existing as-built blocks')
+        set_cached_value('as_built_tunnel_curve', existing_tunnel_curve.Id.IntegerValue)
+        return existing_tunnel_curve
     print('Creating tunnel curve')
     as_designed_tunnel_curve = get_existing_tunnel_curve()
     new_xyz = DB.XYZ(200, -200, 0)
     try:
         transaction.Start('CREATE TUNNEL CURVE')
+        count_transactions()
         new_tunnel_curve_ids = DB.ElementTransformUtils.CopyElement(
             doc,
             as_designed_tunnel_curve.Id,
@@ -113,19 +251,38 @@ def create_tunnel_curve():
     except Exception as e:
         transaction.RollBack()
         raise Exception(e)
+    set_cached_value('as_built_tunnel_curve', new_tunnel_curve.Id.IntegerValue)
     return new_tunnel_curve
 
 
+def find_as_built_tunnel_curve():
+    """The curve the placement points of an existing as-built block are hosted on, or None."""
+    instrumentation.count('collector_scans')
+    as_built_family_names = set(AS_BUILT_FAMILY_NAMES.values())
+    for element in DB.FilteredElementCollector(doc).OfClass(DB.FamilyInstance).ToElements():
+        if element.Symbol.Family.Name not in as_built_family_names:
+            continue
+        placement_point, _ = get_element_placement_points(element)
+        point_reference = placement_point.GetPointElementReference()
+        # Points placed on an edge are PointOnEdge references, anything else says nothing about the curve
+        if point_reference is not None and hasattr(point_reference, 'GetEdgeReference'):
+            return doc.GetElement(point_reference.GetEdgeReference().ElementId)
+    return None
+
+
 def get_existing_tunnel_curve():
-    result = search_for_tunnel_curve(doc)
+    result = get_cached_element('tunnel_curve') or search_for_tunnel_curve(doc)
     if result:
+        set_cached_value('tunnel_curve', result.Id.IntegerValue)
         return result
     else:
         search_families_having_tunnel_curve()
 
 
 def search_for_tunnel_curve(document):
+    instrumentation.count('collector_scans')
     elements_collector = DB.FilteredElementCollector(document)\
+        .OfClass(DB.CurveElement)\
         .WhereElementIsNotElementType()\
         .ToElements()
     for element in elements_collector:
@@ -137,13 +294,24 @@ def search_for_tunnel_curve(document):
 
 def search_families_having_tunnel_curve():
     available_families = []
+    # Family unique ids mapped to whether the family contains a tunnel axis
+    document_version = Utils.get_document_version(doc)
+    families_having_tunnel_curve = document_cache.get(document_key, document_version, 'families_having_tunnel_curve',
+                                                      {})
+    instrumentation.count('collector_scans')
     for family in Utils.get_families():
         family = doc.GetElement(family.Id)
         if family.IsEditable:
-            fam_doc = doc.EditFamily(family)
-            result = search_for_tunnel_curve(fam_doc)
-            if result:
+            has_tunnel_curve = families_having_tunnel_curve.get(family.UniqueId)
+            if has_tunnel_curve is None:
+                fam_doc = doc.EditFamily(family)
+                has_tunnel_curve = search_for_tunnel_curve(fam_doc) is not None
+                fam_doc.Close(False)
+                families_having_tunnel_curve[family.UniqueId] = has_tunnel_curve
+            if has_tunnel_curve:
                 available_families.append(family.Name)
+    document_cache.set(document_key, document_version, 'families_having_tunnel_curve', families_having_tunnel_curve)
+    document_cache.save()
     content = Utils.format_list_to_string(available_families)
     Alert(title='Error',
           header='Could not locate tunnel curve, '
@@ -154,37 +322,59 @@ def search_families_having_tunnel_curve():
 
 def create_section_block(
         section_element_type_name,
-        tunnel_curve,
+        family_name,
+        point_registry,
         beginning_meter,
         ending_meter
     ):
-    section_family_element_type = Utils.get_as_built_element(doc, section_element_type_name)
+    section_family_element_type = Utils.get_as_built_element(symbol_index, section_element_type_name, family_name)
+    # Inside a round batch the batch transaction is already open
+    own_transaction = not doc.IsModifiable
 
     try:
-        transaction.Start("CREATE SECTION BLOCK")
+        if own_transaction:
+            transaction.Start("CREATE SECTION BLOCK")
+            count_transactions()
         section_family_element_type.Activate()
         new_section_block = DB.AdaptiveComponentInstanceUtils.\
             CreateAdaptiveComponentInstance(
             doc,
             section_family_element_type
         )
-        placement_point_a, placement_point_b = get_element_placement_points(
-            new_section_block
-        )
-        placement_point_a.SetPointElementReference(
-            create_new_point_on_edge(tunnel_curve, beginning_meter)
-        )
-        placement_point_b.SetPointElementReference(
-            create_new_point_on_edge(tunnel_curve, ending_meter)
-        )
-        transaction.Commit()
+        set_section_block_placement(new_section_block, point_registry, beginning_meter, ending_meter)
+        if own_transaction:
+            transaction.Commit()
     except Exception as e:
-        transaction.RollBack()
+        if own_transaction:
+            transaction.RollBack()
         raise Exception("Couldn't create section block", e)
 
     return new_section_block
 
 
+def change_section_block_type(section_element, section_element_type_name, family_name):
+    section_family_element_type = Utils.get_as_built_element(symbol_index, section_element_type_name, family_name)
+    own_transaction = not doc.IsModifiable
+    try:
+        if own_transaction:
+            transaction.Start('CHANGE SECTION BLOCK TYPE')
+            count_transactions()
+        section_family_element_type.Activate()
+        section_element.ChangeTypeId(section_family_element_type.Id)
+        if own_transaction:
+            transaction.Commit()
+    except Exception as e:
+        if own_transaction:
+            transaction.RollBack()
+        raise Exception("Couldn't change section block type", e)
+
+
+def set_section_block_placement(section_element, point_registry, beginning_meter, ending_meter):
+    placement_point_a, placement_point_b = get_element_placement_points(section_element)
+    placement_point_a.SetPointElementReference(point_registry.get(beginning_meter))
+    placement_point_b.SetPointElementReference(point_registry.get(ending_meter))
+
+
 def get_element_placement_points(element):
     try:
         placement_points = DB.AdaptiveComponentInstanceUtils.\
@@ -206,136 +396,150 @@ def create_new_point_on_edge(edge, position_meter):
 
 
 def set_element_parameter(element, parameter_name, parameter_value):
+    own_transaction = not doc.IsModifiable
     try:
-        transaction.Start('SET PARAMETER')
+        if own_transaction:
+            transaction.Start('SET PARAMETER')
+            count_transactions()
         parameter = get_element_parameter(element, parameter_name)
         parameter.Set(parameter_value)
-        transaction.Commit()
+        if own_transaction:
+            transaction.Commit()
     except Exception as e:
-        transaction.RollBack()
+        if own_transaction:
+            transaction.RollBack()
         raise Exception("Couldn't set section parameter", e)
 
 
 def get_element_parameter(element, parameter_name):
-    for p in element.Parameters:
-        if p.Definition.Name == parameter_name:
-            return p
-    raise NotFoundException("Parameter not found!", parameter_name)
-
-
-def add_tunnel_element(start_meter, end_meter, material, comment, start_time, end_time, duration):
-    print('Adding tunnel element')
-    as_designed_element_name = find_as_designed_element_name(start_meter, end_meter)
-    if as_designed_element_name is None:
-        as_designed_element_name = TextInput('Could not find element at position (' + str(start_meter) +' - ' + str(end_meter) + ')',
-                                             description='Please enter the model type name for this tunnel round',
-                                             default='EBO_K')
-    section_element = create_section_block(as_designed_element_name, as_built_tunnel_curve, start_meter, end_meter)
-    set_element_parameter(section_element, 'Kommentar', comment)
-    set_element_parameter(section_element, 'Station Anfang', str(start_meter) + 'm')
-    set_element_parameter(section_element, 'Station Ende', str(end_meter) + 'm')
-    set_element_parameter(section_element, 'Zeit Anfang', start_time)
-    set_element_parameter(section_element, 'Zeit Ende', end_time)
-    set_element_parameter(section_element, 'Dauer', duration)
-    add_section_material(material, section_element)
-    set_section_position(start_meter, end_meter, section_element)
-
-
-def add_section_material(material, section_element):
-    print('Adding section material')
-    for item in material:
-        set_element_parameter(section_element, item['name'], str(item['value']) + ' ' + item['value_type'])
-
-
-def set_section_position(start_meter, end_meter, section_element):
-    print('Setting section position')
-    position_parameters = approximate_section_position_parameters(start_meter, end_meter, section_element.Name)
-    for parameter in position_parameters:
-        parameter_name = parameter[0]
-        parameter_value = parameter[1]
-        set_element_parameter(section_element, parameter_name, parameter_value)
-
-
-def approximate_section_position_parameters(start_meter, end_meter, element_type):
-    overlap_elements = find_as_designed_elements_that_overlap_element(start_meter, end_meter, element_type)
-    return [
-        ('Gradientenhöhe_A', Utils.millimeter_to_feet(approximate_parameter(overlap_elements, 'Gradientenhöhe_A'))),
-        ('Gradientenhöhe_B', Utils.millimeter_to_feet(approximate_parameter(overlap_elements, 'Gradientenhöhe_B'))),
-        ('Querneigung', DB.UnitUtils.ConvertToInternalUnits(approximate_parameter(overlap_elements, 'Querneigung'),
-                                                            get_degree_forge_type())),
-        ('rotXY_A', DB.UnitUtils.ConvertToInternalUnits(approximate_parameter(overlap_elements, 'rotXY_A'),
-                                                        get_degree_forge_type())),
-        ('rotXY_B', DB.UnitUtils.ConvertToInternalUnits(approximate_parameter(overlap_elements, 'rotXY_B'),
-                                                        get_degree_forge_type())),
-    ]
+    p = parameter_cache.get(element, parameter_name)
+    if p is None:
+        raise NotFoundException("Parameter not found!", parameter_name)
+    return p
+
+
+def apply_round_plan(round_plan):
+    existing_element = as_built_rounds.get_element(round_plan.key)
+    if round_plan.type_name is None:
+        if existing_element is not None:
+            as_designed_element_name = existing_element.name
+        else:
+            as_designed_element_name = TextInput('Could not find element at position (' + str(round_plan.start_meter) +' - ' + str(round_plan.end_meter) + ')',
+                                                 description='Please enter the model type name for this tunnel round',
+                                                 default=AS_DESIGNED_TYPE_NAMES[round_plan.cross_section_type])
+        generation_plan.resolve_type(round_plan, as_designed_element_name)
+    if existing_element is not None:
+        update_round(existing_element, round_plan)
+    else:
+        print('Adding tunnel element')
+        with instrumentation.span('add_tunnel_element.create_section_block'):
+            section_element = create_section_block(round_plan.type_name, round_plan.family_name, point_registry,
+                                                   round_plan.start_meter, round_plan.end_meter)
+        with instrumentation.span('add_tunnel_element.set_parameters'):
+            for parameter_name, parameter_value, unit in round_plan.parameters:
+                set_element_parameter(section_element, parameter_name, convert_to_internal_units(parameter_value, unit))
+        as_built_rounds.created += 1
+    as_built_rounds.record(round_plan.key, round_plan.get_fingerprint())
+
+
+def update_round(section_element, round_plan):
+    changed_parameter_names = []
+    if section_element.Symbol.Name != round_plan.type_name:
+        change_section_block_type(section_element, round_plan.type_name, round_plan.family_name)
+        changed_parameter_names.append('Typ')
+    with instrumentation.span('add_tunnel_element.update_parameters'):
+        for parameter_name, parameter_value, unit in round_plan.parameters:
+            value = convert_to_internal_units(parameter_value, unit)
+            if not is_parameter_value_equal(get_element_parameter(section_element, parameter_name), value):
+                set_element_parameter(section_element, parameter_name, value)
+                changed_parameter_names.append(parameter_name)
+    if 'Station Anfang' in changed_parameter_names or 'Station Ende' in changed_parameter_names:
+        set_section_block_placement(section_element, point_registry, round_plan.start_meter, round_plan.end_meter)
+    if changed_parameter_names:
+        print('Updated tunnel element {}: {}'.format(round_plan.key, ', '.join(changed_parameter_names)))
+        as_built_rounds.updated += 1
+    else:
+        as_built_rounds.unchanged += 1
 
 
-def find_as_designed_element_name(start_meter, end_meter):
-    collector = db.Collector(of_class='FamilyInstance')
-    elements = collector.get_elements()
-    for e in elements:
-        try:
-            if e.Symbol.Family.Name != 'as-built' and has_blocknummer(e):
-                element_start_meter, element_end_meter = find_as_designed_model_position(e)
-                if element_overlap(start_meter, end_meter, element_start_meter, element_end_meter):
-                    return e.name
-        except Exception as e:
-            continue
-    return None
+def is_parameter_value_equal(parameter, value):
+    if isinstance(value, float):
+        current_value = parameter.AsDouble()
+        return current_value is not None and abs(current_value - value) <= PARAMETER_TOLERANCE
+    return (parameter.AsString() or '') == ('' if value is None else str(value))
 
 
-def has_blocknummer(element):
-    try:
-        p = get_element_parameter(element, 'Blocknummer')
-        return True
-    except Exception as e:
-        return False
+def convert_to_internal_units(value, unit):
+    if unit == GenerationPlanner.MILLIMETER:
+        return Utils.millimeter_to_feet(value)
+    if unit == GenerationPlanner.DEGREE:
+        return value * get_degree_to_internal_factor()
+    return value
+
+
+def get_degree_to_internal_factor():
+    # Resolved once, GetAllUnits is scanned only on first use
+    global degree_to_internal_factor
+    if degree_to_internal_factor is None:
+        degree_to_internal_factor = DB.UnitUtils.ConvertToInternalUnits(1.0, get_degree_forge_type())
+    return degree_to_internal_factor
 
 
-def find_as_designed_elements_that_overlap_element(start_meter, end_meter, type):
-    as_designed_elements = []
+def index_as_built_rounds():
+    print('Indexing existing as-built elements')
+    checkpoint = RoundCheckpoint(os.path.join(Utils.get_data_directory(), 'generation_checkpoint.json'),
+                                 Utils.get_document_key(doc))
+    rounds = AsBuiltRounds(checkpoint)
+    instrumentation.count('collector_scans')
+    collector = db.Collector(of_class='FamilyInstance')
+    # Blocks of every cross section, round ids are unique across them
+    as_built_family_names = set(AS_BUILT_FAMILY_NAMES.values())
+    for e in collector.get_elements():
+        if e.Symbol.Family.Name not in as_built_family_names:
+            continue
+        p = parameter_cache.get(e, GenerationPlanner.ROUND_TAG_PARAMETER)
+        round_key = p.AsString() if p is not None else None
+        if round_key:
+            rounds.add_element(round_key, e)
+    return rounds
+
+
+def export_as_designed_table():
+    as_designed_table = get_cached_value('as_designed_table')
+    if as_designed_table is not None:
+        print('Using as-designed elements of the last run')
+        return as_designed_table
+    print('Exporting as-designed elements')
+    as_designed_table = []
+    instrumentation.count('collector_scans')
     collector = db.Collector(of_class='FamilyInstance')
     elements = collector.get_elements()
+    as_built_family_names = set(AS_BUILT_FAMILY_NAMES.values())
     for e in elements:
-        if e.name == type and e.Symbol.Family.Name != 'as-built':
-            element_start_meter, element_end_meter = find_as_designed_model_position(e)
-            if element_overlap(start_meter, end_meter, element_start_meter, element_end_meter):
-                as_designed_elements.append(doc.GetElement(e.Id))
-    return as_designed_elements
-
-
-def find_as_designed_model_position(element):
-    p = get_element_parameter(element, 'Blocknummer')
-    blocknummer = int(p.AsValueString())
-    element_start_meter = blocknummer - 1
-    element_end_meter = blocknummer
-    return element_start_meter, element_end_meter
-
-
-def element_overlap(element_A_start, element_A_end, element_B_start, element_B_end):
-    if is_position_between(element_A_start, element_B_start, element_B_end) or is_position_between(element_A_end,
-                                                                                                   element_B_start,
-                                                                                                   element_B_end):
-        return True
-    return False
-
-
-def is_position_between(current_position, start_position, end_position):
-    if start_position <= current_position <= end_position:
-        return True
-    return False
+        try:
+            if e.Symbol.Family.Name in as_built_family_names:
+                continue
+            # As-designed elements are read once and never written, LookupParameter spares a parameter map for each
+            p = e.LookupParameter('Blocknummer')
+            if p is not None:
+                row = {'type': e.name, 'family': e.Symbol.Family.Name, 'Blocknummer': int(p.AsValueString())}
+                for parameter_name, unit in GenerationPlanner.POSITION_PARAMETERS:
+                    row[parameter_name] = read_position_parameter(e, parameter_name)
+                as_designed_table.append(row)
+        except Exception as e:
+            continue
+    set_cached_value('as_designed_table', as_designed_table)
+    return as_designed_table
 
 
-def approximate_parameter(elements, parameter_name):
-    parameter_values = []
-    avg_value = 0
-    for element in elements:
-        parameter = get_element_parameter(element, parameter_name)
-        parameter_value = extract_double_from_string(clean_string(parameter.AsValueString()))
-        parameter_values.append(parameter_value)
-    if len(parameter_values) > 0:
-        avg_value = sum(parameter_values) / len(parameter_values)
-    return avg_value
+def read_position_parameter(element, parameter_name):
+    parameter = element.LookupParameter(parameter_name)
+    if parameter is None:
+        return None
+    value = parameter.AsValueString()
+    if not value:
+        return None
+    return extract_double_from_string(clean_string(value))
 
 
 def clean_string(value):
@@ -357,35 +561,256 @@ def get_degree_forge_type():
             return u
 
 
-def load_construction_data():
+def load_construction_data(cross_section_types=None):
+    global construction_data_path
     print('Loading construction data')
+    store_path = os.path.join(Utils.get_data_directory(), 'tims' + snapshot_store.SQLITE_EXTENSION)
+    if snapshot_store.is_available() and os.path.isfile(store_path) and ask_store_source():
+        construction_data_path = store_path
+        start_meter, end_meter = ask_window('Chainage window', 'From - to in meters, e.g. 1200 - 1500',
+                                            float)
+        start_time, end_time = ask_window('Time window', 'From - to as day.month.year, e.g. 1.3.2021 - 31.3.2021',
+                                          lambda value: datetime.datetime.strptime(value, '%d.%m.%Y'))
+        if end_time is not None:
+            # The window includes its last day
+            end_time += datetime.timedelta(days=1)
+        return snapshot_store.iterate_rounds(store_path, start_meter=start_meter, end_meter=end_meter,
+                                             start_time=start_time, end_time=end_time,
+                                             cross_section_types=cross_section_types)
     Alert("Click button \'Load data from TIMS\' to generate current data snapshot from TIMS. You are also able to add your own construction data",
           header="Adding Construction Data",
           title="Information")
-    file_path = forms.pick_file(title='Please select a file containing construction information', file_ext='json')
-    data = open(file_path, 'r').read()
-    return json.loads(data)
+    file_path = forms.pick_file(title='Please select a file containing construction information',
+                                files_filter='TIMS snapshot (*.ndjson;*.json)|*.ndjson;*.json')
+    construction_data_path = file_path
+    return snapshot.iterate_rounds(file_path)
+
+
+def load_section_rounds(section_ids, cross_section_types=None):
+    """All rounds of the sections in the construction data, whatever window was loaded for generation."""
+    if construction_data_path.endswith(snapshot_store.SQLITE_EXTENSION):
+        return snapshot_store.iterate_rounds(construction_data_path, section_ids=sorted(section_ids),
+                                             cross_section_types=cross_section_types)
+    return ((section, round) for section, round in snapshot.iterate_rounds(construction_data_path)
+            if section['id'] in section_ids)
+
+
+def ask_store_source():
+    """Asks whether to load from the TIMS store or to pick a snapshot file, True for the store."""
+    source = forms.CommandSwitchWindow.show([STORE_SOURCE, SNAPSHOT_FILE_SOURCE],
+                                            message='Load construction data from')
+    if source is None:
+        raise Exception("No construction data source selected")
+    return source == STORE_SOURCE
+
+
+def ask_window(title, description, parse):
+    """Asks for a 'from - to' window, either side may be left empty."""
+    value = TextInput(title, default='', description=description + '. Leave empty to load all rounds.')
+    if not value or not value.strip():
+        return None, None
+    bounds = [bound.strip() for bound in value.split(' - ', 1)] + ['']
+    try:
+        return tuple(parse(bound) if bound else None for bound in bounds[:2])
+    except ValueError:
+        raise Exception("Could not read the window '" + value + "'")
+
+
+def select_cross_sections():
+    selected = forms.SelectFromList.show(CROSS_SECTION_TYPES, multiselect=True, button_name='Generate',
+                                         title='Select cross section types of tunnel rounds you want to generate')
+    if not selected:
+        raise Exception("No cross section type selected")
+    return [cross_section_type for cross_section_type in CROSS_SECTION_TYPES if cross_section_type in selected]
 
 
-def add_construction_data(construction_data):
+def plan_cross_sections(as_designed_families):
+    """Maps each selected cross section type to its (as-designed family name, as-built family name)."""
+    return dict((cross_section_type, (family.Name, AS_BUILT_FAMILY_NAMES[cross_section_type]))
+                for cross_section_type, family in as_designed_families.items())
+
+
+def add_construction_data():
+    global as_built_rounds
     print('Adding construction data')
-    cross_section_type = SelectFromList('Select cross section type of tunnel rounds you want to generate',
-                                        ["Kalotte", "Strosse", "Sohle"])
-    for item in construction_data['sections']:
-        for round in item['rounds']:
-                add_tunnel_element(round['start_meter'], round['end_meter'], round['material'], round['comment'],
-                                   round['start_datetime'], round['end_datetime'], round['duration'])
+    with instrumentation.span('index_as_built_rounds'):
+        as_built_rounds = index_as_built_rounds()
+    with instrumentation.span('create_boundary_points'):
+        create_boundary_points()
+    with instrumentation.span('apply_generation_plan'):
+        apply_generation_plan()
+
+
+def plan_construction_data(construction_data):
+    # Plans of every round are kept, families need all material names and boundary points all chainages up front,
+    # while the snapshot itself is only streamed through
+    for section, round in construction_data:
+        generation_plan.add_round(section, round)
+    if SUMMARY_MEASURES and generation_plan.rounds:
+        plan_summary_parameters()
+    generation_plan.plan_positions()
+
+
+def plan_summary_parameters():
+    if not material_rollup.is_available():
+        print('NumPy is not available, summary parameters are left out')
+        return
+    # Cumulative quantities run over whole sections, so a block keeps its value whichever window generates it
+    section_ids = set([round_plan.section_id for round_plan in generation_plan.rounds])
+    with instrumentation.span('material_rollup'):
+        rollup = material_rollup.MaterialRollup(load_section_rounds(section_ids,
+                                                                    generation_plan.get_cross_section_types()))
+        generation_plan.add_summary_parameters(rollup.get_round_summaries(SUMMARY_MEASURES))
+
+
+def create_boundary_points():
+    chainages = set()
+    for round_plan in generation_plan.rounds:
+        # Rounds already in the model keep their points unless their chainages changed
+        if as_built_rounds.get_element(round_plan.key) is None:
+            chainages.update([round_plan.start_meter, round_plan.end_meter])
+    point_registry.create_all(chainages)
+
+
+def apply_generation_plan():
+    transaction_batch = TransactionBatch(doc, ROUNDS_PER_TRANSACTION, as_built_rounds.commit, as_built_rounds.discard)
+    try:
+        for round_plan in generation_plan.rounds:
+            if round_plan.is_positioned and as_built_rounds.is_current(round_plan.key, round_plan.get_fingerprint()):
+                as_built_rounds.unchanged += 1
+                continue
+            with instrumentation.span('add_tunnel_element'):
+                transaction_batch.run_round('{}m - {}m'.format(round_plan.start_meter, round_plan.end_meter),
+                                            lambda: apply_round_plan(round_plan))
+        transaction_batch.commit()
+    except Exception:
+        transaction_batch.roll_back()
+        raise
+    finally:
+        as_built_rounds.checkpoint.compact()
+        count_transactions(transaction_batch.transaction_count)
+        instrumentation.set_counter('rolled_back_rounds', len(transaction_batch.failed_rounds))
+    print(transaction_batch.summary())
+    print(as_built_rounds.summary())
+    print(point_registry.summary())
+
+
+def get_cached_value(name, default=None):
+    if not WARM_START:
+        return default
+    value = warm_start_cache.get(document_key, document_fingerprint, name)
+    if value is None:
+        return default
+    instrumentation.count('document_cache_hits')
+    return value
+
+
+def set_cached_value(name, value):
+    if WARM_START:
+        warm_start_cache.set(document_key, document_fingerprint, name, value)
+
+
+def get_cached_element(name):
+    element_id_value = get_cached_value(name)
+    if element_id_value is None:
+        return None
+    return doc.GetElement(DB.ElementId(element_id_value))
+
+
+def load_warm_start_cache():
+    """Takes the fingerprint cached values are looked up and stored under, before the run changes the document."""
+    global document_fingerprint
+    if not WARM_START:
+        return
+    document_fingerprint = get_document_fingerprint()
+    entries = get_cached_value('symbol_index')
+    if entries is not None:
+        symbol_index.load_entries(entries)
+
+
+def save_warm_start_cache():
+    """Keeps the cached values for the next run, under the fingerprint this run's own changes left behind."""
+    if not WARM_START or document_fingerprint is None:
+        return
+    set_cached_value('symbol_index', symbol_index.get_entries())
+    # A run that started no transaction left the document as it found it
+    if document_transaction_count > 0:
+        warm_start_cache.set_version(document_key, document_fingerprint, get_document_fingerprint())
+    warm_start_cache.save()
+
+
+def get_document_fingerprint():
+    instrumentation.count('collector_scans', 3)
+    return Utils.get_document_fingerprint(doc)
+
+
+def count_transactions(amount=1):
+    """Counts transactions started on the document or its families."""
+    global document_transaction_count
+    document_transaction_count += amount
+    instrumentation.count('transactions', amount)
+
+
+def report_instrumentation():
+    instrumentation.set_counter('parameter_lookups', parameter_cache.hits + parameter_cache.misses)
+    instrumentation.set_counter('parameter_maps_built', parameter_cache.misses)
+    instrumentation.set_counter('symbol_index_refreshes', symbol_index.refresh_count)
+    if as_built_rounds is not None:
+        instrumentation.set_counter('rounds_created', as_built_rounds.created)
+        instrumentation.set_counter('rounds_updated', as_built_rounds.updated)
+        instrumentation.set_counter('rounds_unchanged', as_built_rounds.unchanged)
+    instrumentation.count('collector_scans', symbol_index.refresh_count)
+    report_path = instrumentation.write_report(os.path.join(Utils.get_data_directory(), 'reports'),
+                                               create_report_name('generation'))
+    if report_path is None:
+        return
+    script.get_output().print_table(table_data=instrumentation.get_rows(), columns=REPORT_COLUMNS,
+                                    title='Generation profile')
+    print('Profile written to ' + report_path)
 
 
 # Transactions are context-like objects that guard any changes made to a Revit model
 transaction = DB.Transaction(doc)
-
-try:
-    create_construction_family('as-built.rfa')
-    load_construction_family('as-built.rfa')
-    as_built_tunnel_curve = create_tunnel_curve()
-    data = load_construction_data()
-    add_construction_data(data)
-    Alert("As-built model generated successfully!", header="Automatic Generation Finished")
-except Exception as error:
-    Alert(str(error), header="Automatic Generation Finished", title="User error occured")
+parameter_cache = ParameterCache()
+symbol_index = Utils.SymbolIndex(doc)
+degree_to_internal_factor = None
+document_cache = DocumentCache(os.path.join(Utils.get_data_directory(), 'document_cache.json'))
+# Keyed by document fingerprint rather than version, so it outlives saving the model after a run
+warm_start_cache = DocumentCache(os.path.join(Utils.get_data_directory(), 'warm_start_cache.json'))
+instrumentation = Instrumentation(INSTRUMENTATION)
+as_built_rounds = None
+# Store or snapshot file the construction data was loaded from
+construction_data_path = None
+document_key = Utils.get_document_key(doc)
+# Taken by load_warm_start_cache once the run starts
+document_fingerprint = None
+document_transaction_count = 0
+
+if __name__ == '__main__':
+    try:
+        load_warm_start_cache()
+        with instrumentation.span('export_as_designed_table'):
+            as_designed_table = export_as_designed_table()
+        # All selected cross sections are generated in one pass sharing the index, symbols and tunnel curve
+        cross_section_types = select_cross_sections()
+        as_designed_families = locate_as_designed_families(cross_section_types)
+        generation_plan = GenerationPlanner.GenerationPlan(as_designed_table, POSITION_MODE,
+                                                           plan_cross_sections(as_designed_families))
+        # Rounds are read while they are planned, the span sums the reading only
+        data = instrumentation.iterate('load_construction_data', load_construction_data(cross_section_types))
+        # Planned first, the families only need parameters for the materials in the data
+        with instrumentation.span('plan_construction_data'):
+            plan_construction_data(data)
+        prepare_construction_families(as_designed_families, generation_plan.material_names)
+        with instrumentation.span('create_tunnel_curve'):
+            as_built_tunnel_curve = create_tunnel_curve()
+        point_registry = PointRegistry(lambda position_meter: create_new_point_on_edge(as_built_tunnel_curve, position_meter),
+                                       POINT_TOLERANCE_METER)
+        add_construction_data()
+        print(parameter_cache.summary())
+        Alert("As-built model generated successfully!", header="Automatic Generation Finished")
+    except Exception as error:
+        Alert(str(error), header="Automatic Generation Finished", title="User error occured")
+    finally:
+        save_warm_start_cache()
+        report_instrumentation()
@@ -0,0 +1,71 @@
+import time
+
+from Autodesk.Revit import DB
+
+
+class TransactionBatch:
+    """Commits the changes of several rounds in one transaction, rolling back failed rounds through sub-transactions."""
+
+    def __init__(self, document, rounds_per_transaction, on_commit=None, on_roll_back=None):
+        self.document = document
+        self.rounds_per_transaction = max(1, rounds_per_transaction)
+        self.on_commit = on_commit
+        self.on_roll_back = on_roll_back
+        self.transaction_count = 0
+        self.batch_durations = []
+        self.failed_rounds = []
+        self._transaction = None
+        self._rounds_in_transaction = 0
+        self._batch_start = None
+
+    def run_round(self, round_name, function):
+        if self._transaction is None:
+            self._start()
+        sub_transaction = DB.SubTransaction(self.document)
+        try:
+            sub_transaction.Start()
+            function()
+            sub_transaction.Commit()
+        except Exception as e:
+            if sub_transaction.HasStarted() and not sub_transaction.HasEnded():
+                sub_transaction.RollBack()
+            print('Rolled back round {}: {}'.format(round_name, e))
+            self.failed_rounds.append((round_name, e))
+        self._rounds_in_transaction += 1
+        if self._rounds_in_transaction >= self.rounds_per_transaction:
+            self.commit()
+
+    def commit(self):
+        if self._transaction is None:
+            return
+        self._transaction.Commit()
+        self._end()
+        if self.on_commit is not None:
+            self.on_commit()
+
+    def roll_back(self):
+        if self._transaction is None:
+            return
+        self._transaction.RollBack()
+        self._end()
+        if self.on_roll_back is not None:
+            self.on_roll_back()
+
+    def summary(self):
+        total_duration = sum(self.batch_durations)
+        average_duration = total_duration / len(self.batch_durations) if self.batch_durations else 0
+        return 'Transactions: {} committed in {:.2f}s ({:.2f}s per batch), {} rounds rolled back'.format(
+            self.transaction_count, total_duration, average_duration, len(self.failed_rounds))
+
+    def _start(self):
+        self._transaction = DB.Transaction(self.document)
+        self._transaction.Start('ADD TUNNEL ROUNDS')
+        self._rounds_in_transaction = 0
+        self._batch_start = time.time()
+
+    def _end(self):
+        duration = time.time() - self._batch_start
+        self.transaction_count += 1
+        self.batch_durations.append(duration)
+        print('Batch of {} rounds took {:.2f}s'.format(self._rounds_in_transaction, duration))
+        self._transaction = None
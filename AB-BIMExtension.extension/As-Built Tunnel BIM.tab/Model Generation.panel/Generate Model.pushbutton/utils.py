@@ -1,23 +1,68 @@
+import os
 from rpw import db
+from Autodesk.Revit import DB
 from not_found_exception import NotFoundException
 
 
-def get_element(revit_document, name):
-    collector = db.Collector(of_class='FamilySymbol')
-    elements = collector.get_elements()
-    for e in elements:
-        if e.name == name:
-            return revit_document.GetElement(e.Id)
-    raise NotFoundException("Element not found", name)
-
-
-def get_as_built_element(revit_document, name):
-    collector = db.Collector(of_class='FamilySymbol')
-    elements = collector.get_elements()
-    for e in elements:
-        if e.name == name and e.Family.Name == 'as-built':
-            return revit_document.GetElement(e.Id)
-    raise NotFoundException("Element not found", name)
+class SymbolIndex:
+    """FamilySymbol ids by (family name, type name), rebuilt when a name is missing."""
+
+    def __init__(self, revit_document):
+        self.revit_document = revit_document
+        self._ids = {}
+        # Filled by the first lookup, which misses, unless loaded from an earlier run
+        self._ids_by_type_name = {}
+        self.refresh_count = 0
+
+    def refresh(self):
+        self.refresh_count += 1
+        self._ids = {}
+        self._ids_by_type_name = {}
+        collector = db.Collector(of_class='FamilySymbol')
+        elements = collector.get_elements()
+        for e in elements:
+            self._ids.setdefault((e.Family.Name, e.name), e.Id)
+            self._ids_by_type_name.setdefault(e.name, e.Id)
+
+    def get(self, name, family_name=None):
+        element_id = self._find_id(name, family_name)
+        # Ids loaded from an earlier run may belong to symbols deleted since
+        element = self.revit_document.GetElement(element_id) if element_id is not None else None
+        if element is None:
+            self.refresh()
+            element_id = self._find_id(name, family_name)
+            element = self.revit_document.GetElement(element_id) if element_id is not None else None
+        if element is None:
+            raise NotFoundException("Element not found", name)
+        return element
+
+    def get_entries(self):
+        """Id values of the index, JSON serializable so a later run can start from them."""
+        return {
+            'ids': [[family_name, type_name, element_id.IntegerValue]
+                    for (family_name, type_name), element_id in self._ids.items()],
+            'ids_by_type_name': [[type_name, element_id.IntegerValue]
+                                 for type_name, element_id in self._ids_by_type_name.items()],
+        }
+
+    def load_entries(self, entries):
+        for family_name, type_name, element_id_value in entries['ids']:
+            self._ids[(family_name, type_name)] = DB.ElementId(element_id_value)
+        for type_name, element_id_value in entries['ids_by_type_name']:
+            self._ids_by_type_name[type_name] = DB.ElementId(element_id_value)
+
+    def _find_id(self, name, family_name):
+        if family_name is None:
+            return self._ids_by_type_name.get(name)
+        return self._ids.get((family_name, name))
+
+
+def get_element(symbol_index, name):
+    return symbol_index.get(name)
+
+
+def get_as_built_element(symbol_index, name, family_name='as-built'):
+    return symbol_index.get(name, family_name)
 
 
 def get_element_family(element):
@@ -47,4 +92,36 @@ def millimeter_to_feet(millimeter_value):
 
 
 def meter_to_feet(meter_value):
-    return millimeter_to_feet(meter_to_millimeter(meter_value))
\ No newline at end of file
+    return millimeter_to_feet(meter_to_millimeter(meter_value))
+
+
+def get_data_directory():
+    absolute_path_of_script = os.path.dirname(os.path.abspath(__file__))
+    absolute_file_path = os.path.dirname(os.path.dirname(os.path.dirname(absolute_path_of_script)))
+    return os.path.join(absolute_file_path, 'data')
+
+
+def get_document_key(revit_document):
+    return revit_document.PathName or revit_document.Title
+
+
+def get_document_version(revit_document):
+    try:
+        return str(DB.Document.GetDocumentVersion(revit_document).VersionGUID)
+    except Exception:
+        # Documents that were never saved have no version to key cached values on
+        return None
+
+
+def get_document_fingerprint(revit_document):
+    """Version stamp of the document with the count and highest id of its instances, types and curves.
+
+    The version changes with every save, which catches edits saved since, the counts with any element added or
+    deleted. Only element ids are collected, no element or parameter is read.
+    """
+    parts = [str(get_document_version(revit_document))]
+    for element_class in (DB.FamilyInstance, DB.FamilySymbol, DB.CurveElement):
+        element_ids = DB.FilteredElementCollector(revit_document).OfClass(element_class).ToElementIds()
+        values = [element_id.IntegerValue for element_id in element_ids]
+        parts.append('{}:{}'.format(len(values), max(values or [0])))
+    return '/'.join(parts)
@@ -0,0 +1,144 @@
+import csv
+import json
+import os
+import threading
+import time
+
+# IronPython 2.7, which runs the generator inside Revit, has no perf_counter
+clock = getattr(time, 'perf_counter', time.time)
+
+REPORT_TIMESTAMP_FORMAT = '%d%m%Y_%H%M%S'
+REPORT_COLUMNS = ['kind', 'name', 'count', 'total_seconds', 'mean_seconds', 'max_seconds']
+
+
+class Instrumentation:
+    """Timing spans and counters of one pushbutton run, aggregated by name and written out as a report."""
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started = time.time()
+        # name -> [count, total seconds, max seconds]
+        self.spans = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name)
+
+    def iterate(self, name, iterable):
+        """Passes the items of a lazy iterable through, recording the time spent producing them as one span."""
+        if not self.enabled:
+            return iterable
+        return self._iterate(name, iterable)
+
+    def _iterate(self, name, iterable):
+        iterator = iter(iterable)
+        duration = 0.0
+        try:
+            while True:
+                start = clock()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    duration += clock() - start
+                yield item
+        finally:
+            self.record_span(name, duration)
+
+    def count(self, name, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def set_counter(self, name, value):
+        """Records a count kept by another object, e.g. the hits of a cache."""
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[name] = value
+
+    def record_span(self, name, duration):
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                self.spans[name] = [1, duration, duration]
+            else:
+                span[0] += 1
+                span[1] += duration
+                span[2] = max(span[2], duration)
+
+    def get_rows(self):
+        rows = []
+        for name in sorted(self.spans, key=lambda span_name: -self.spans[span_name][1]):
+            count, total, maximum = self.spans[name]
+            rows.append(['span', name, count, round(total, 4), round(total / count, 6), round(maximum, 4)])
+        for name in sorted(self.counters):
+            rows.append(['counter', name, self.counters[name], '', '', ''])
+        return rows
+
+    def to_dict(self):
+        return {
+            'started': self.started,
+            'duration': time.time() - self.started,
+            'spans': dict((name, {'count': count, 'total_seconds': total, 'max_seconds': maximum})
+                          for name, (count, total, maximum) in self.spans.items()),
+            'counters': dict(self.counters),
+        }
+
+    def write_report(self, directory, name):
+        """Writes <name>.json and <name>.csv to directory and returns the JSON path, or None when switched off."""
+        if not self.enabled:
+            return None
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        json_path = os.path.join(directory, name + '.json')
+        with open(json_path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2, sort_keys=True)
+        with open(os.path.join(directory, name + '.csv'), 'w') as f:
+            writer = csv.writer(f, lineterminator='\n')
+            writer.writerow(REPORT_COLUMNS)
+            writer.writerows(self.get_rows())
+        return json_path
+
+    def summary(self):
+        lines = ['{:<8} {:<45} {:>8} {:>10} {:>10}'.format('Kind', 'Name', 'Count', 'Total [s]', 'Max [s]')]
+        for kind, name, count, total, mean, maximum in self.get_rows():
+            lines.append('{:<8} {:<45} {:>8} {:>10} {:>10}'.format(kind, name, count, total, maximum))
+        return '\n'.join(lines)
+
+
+class Span:
+    def __init__(self, instrumentation, name):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.instrumentation.record_span(self.name, clock() - self.start)
+        return False
+
+
+class NullSpan:
+    """Returned while instrumentation is switched off, so spans cost one attribute check."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_SPAN = NullSpan()
+
+
+def create_report_name(prefix):
+    return prefix + time.strftime(REPORT_TIMESTAMP_FORMAT)
@@ -0,0 +1,242 @@
+import csv
+import io
+import json
+import os
+
+try:
+    import numpy
+except ImportError:
+    # IronPython has no NumPy, rollups are then left to the loader and its CLI
+    numpy = None
+
+
+SECTION_COLUMNS = ['section_id', 'section_name', 'cross_section_type', 'measure', 'uom', 'rounds', 'length_meter',
+                   'quantity', 'quantity_per_meter']
+CHAINAGE_COLUMNS = ['start_meter', 'end_meter', 'measure', 'uom', 'rounds', 'quantity', 'quantity_per_meter',
+                    'cumulative_quantity']
+DEFAULT_BIN_METER = 10.0
+
+
+def is_available():
+    return numpy is not None
+
+
+class MaterialRollup:
+    """Measure quantities of a snapshot in NumPy arrays, rolled up per section, cross section and chainage.
+
+    Rounds are kept in one set of arrays and measures in another, each measure pointing at its round and at its
+    measure definition, a (name, uom) pair, so every rollup is a bincount over combined indexes.
+    """
+
+    def __init__(self, section_rounds):
+        if numpy is None:
+            raise Exception("NumPy is not available in this Python engine, material rollups need it")
+        self.sections = []
+        self.cross_section_types = []
+        self.measures = []
+        self.round_ids = []
+        # Rounds without a start or end chainage cannot be placed along the tunnel and are left out
+        self.skipped_round_count = 0
+        section_indexes = {}
+        cross_section_indexes = {}
+        measure_indexes = {}
+        round_sections, round_cross_sections, start_meters, end_meters = [], [], [], []
+        measure_rounds, measure_definitions, quantities = [], [], []
+        for section, round in section_rounds:
+            start_meter, end_meter = to_quantity(round['start_meter']), to_quantity(round['end_meter'])
+            if start_meter is None or end_meter is None:
+                self.skipped_round_count += 1
+                continue
+            if section['id'] not in section_indexes:
+                section_indexes[section['id']] = len(self.sections)
+                self.sections.append((section['id'], section['name']))
+            cross_section_type = round.get('cross_section_type')
+            if cross_section_type not in cross_section_indexes:
+                cross_section_indexes[cross_section_type] = len(self.cross_section_types)
+                self.cross_section_types.append(cross_section_type)
+            round_index = len(self.round_ids)
+            self.round_ids.append(round.get('id'))
+            round_sections.append(section_indexes[section['id']])
+            round_cross_sections.append(cross_section_indexes[cross_section_type])
+            start_meters.append(start_meter)
+            end_meters.append(end_meter)
+            for item in round['material']:
+                quantity = to_quantity(item['value'])
+                if quantity is None:
+                    continue
+                key = (item['name'], item['value_type'])
+                if key not in measure_indexes:
+                    measure_indexes[key] = len(self.measures)
+                    self.measures.append(key)
+                measure_rounds.append(round_index)
+                measure_definitions.append(measure_indexes[key])
+                quantities.append(quantity)
+        self.round_sections = numpy.array(round_sections, dtype=numpy.intp)
+        self.round_cross_sections = numpy.array(round_cross_sections, dtype=numpy.intp)
+        self.start_meters = numpy.array(start_meters, dtype=float)
+        self.end_meters = numpy.array(end_meters, dtype=float)
+        self.measure_rounds = numpy.array(measure_rounds, dtype=numpy.intp)
+        self.measure_definitions = numpy.array(measure_definitions, dtype=numpy.intp)
+        self.quantities = numpy.array(quantities, dtype=float)
+        self._round_quantities = None
+
+    @property
+    def lengths(self):
+        return numpy.abs(self.end_meters - self.start_meters)
+
+    def get_round_quantities(self):
+        """Rounds x measure definitions matrix of summed quantities."""
+        if self._round_quantities is None:
+            round_count, measure_count = len(self.round_ids), len(self.measures)
+            self._round_quantities = numpy.bincount(
+                self.measure_rounds * measure_count + self.measure_definitions, weights=self.quantities,
+                minlength=round_count * measure_count).reshape(round_count, measure_count)
+        return self._round_quantities
+
+    def select(self, start_meter=None, end_meter=None):
+        """Mask of the rounds overlapping the chainage range, either bound may be None."""
+        mask = numpy.ones(len(self.round_ids), dtype=bool)
+        if start_meter is not None:
+            mask &= numpy.maximum(self.start_meters, self.end_meters) >= start_meter
+        if end_meter is not None:
+            mask &= numpy.minimum(self.start_meters, self.end_meters) <= end_meter
+        return mask
+
+    def get_section_rows(self, start_meter=None, end_meter=None):
+        """Totals and per-metre rates per section, cross section and measure definition, as SECTION_COLUMNS."""
+        mask = self.select(start_meter, end_meter)
+        group_count = len(self.sections) * len(self.cross_section_types)
+        groups = (self.round_sections * len(self.cross_section_types) + self.round_cross_sections)[mask]
+        round_counts = numpy.bincount(groups, minlength=group_count)
+        lengths = numpy.bincount(groups, weights=self.lengths[mask], minlength=group_count)
+        quantities = self._sum_by_group(groups, mask, group_count)
+        counts = self._count_by_group(groups, mask, group_count)
+        rows = []
+        for group, measure in zip(*numpy.nonzero(counts)):
+            section_id, section_name = self.sections[group // len(self.cross_section_types)]
+            name, uom = self.measures[measure]
+            rows.append([section_id, section_name, self.cross_section_types[group % len(self.cross_section_types)],
+                         name, uom, int(round_counts[group]), round(float(lengths[group]), 3),
+                         round(float(quantities[group, measure]), 3),
+                         round(float(quantities[group, measure] / lengths[group]), 3) if lengths[group] else None])
+        return rows
+
+    def get_chainage_rows(self, bin_meter=DEFAULT_BIN_METER, start_meter=None, end_meter=None):
+        """Quantities per chainage bin and measure definition with their cumulative curve, as CHAINAGE_COLUMNS.
+
+        Rounds count towards the bin holding their middle, bins start at a multiple of bin_meter.
+        """
+        if bin_meter <= 0:
+            raise ValueError('Chainage bins need a positive length, got ' + str(bin_meter))
+        mask = self.select(start_meter, end_meter)
+        if not mask.any():
+            return []
+        middles = ((self.start_meters + self.end_meters) / 2)[mask]
+        first_bin = int(numpy.floor(middles.min() / bin_meter))
+        bins = numpy.floor(middles / bin_meter).astype(numpy.intp) - first_bin
+        bin_count = int(bins.max()) + 1
+        round_counts = numpy.bincount(bins, minlength=bin_count)
+        quantities = self._sum_by_group(bins, mask, bin_count)
+        cumulative_quantities = numpy.cumsum(quantities, axis=0).round(3).T.tolist()
+        rates = (quantities / bin_meter).round(3).T.tolist()
+        quantities = quantities.round(3).T.tolist()
+        bin_indexes = numpy.nonzero(round_counts)[0].tolist()
+        round_counts = round_counts.tolist()
+        rows = []
+        for measure, (name, uom) in enumerate(self.measures):
+            for bin_index in bin_indexes:
+                bin_start = (first_bin + bin_index) * bin_meter
+                rows.append([round(bin_start, 3), round(bin_start + bin_meter, 3), name, uom, round_counts[bin_index],
+                             quantities[measure][bin_index], rates[measure][bin_index],
+                             cumulative_quantities[measure][bin_index]])
+        return rows
+
+    def get_round_summaries(self, measure_names):
+        """Per round, the quantity per metre of the round and the cumulative quantity of its section and cross
+        section up to the round, along chainage, of each named measure.
+
+        Returns {round id: [(measure name, uom, quantity per meter, cumulative quantity), ...]}, rounds without an
+        id are left out.
+        """
+        selected = [(measure, name, uom) for measure, (name, uom) in enumerate(self.measures) if name in measure_names]
+        if not selected or not self.round_ids:
+            return {}
+        quantities = self.get_round_quantities()[:, [measure for measure, name, uom in selected]]
+        lengths = self.lengths
+        per_meter = numpy.divide(quantities, lengths[:, None], out=numpy.zeros_like(quantities),
+                                 where=lengths[:, None] > 0)
+        # Sorted by section, cross section and chainage, the running sum restarts at every group
+        groups = self.round_sections * len(self.cross_section_types) + self.round_cross_sections
+        order = numpy.lexsort((numpy.minimum(self.start_meters, self.end_meters), groups))
+        sorted_quantities = quantities[order]
+        running = numpy.cumsum(sorted_quantities, axis=0)
+        sorted_groups = groups[order]
+        group_starts = numpy.concatenate(([True], sorted_groups[1:] != sorted_groups[:-1]))
+        # Position of the first round of each round's group, whose running sum before it is subtracted
+        firsts = numpy.maximum.accumulate(numpy.where(group_starts, numpy.arange(len(order)), 0))
+        cumulative = numpy.empty_like(quantities)
+        cumulative[order] = running - (running[firsts] - sorted_quantities[firsts])
+        summaries = {}
+        for round_index, round_id in enumerate(self.round_ids):
+            if round_id is None:
+                continue
+            summaries[round_id] = [(name, uom, float(per_meter[round_index, column]),
+                                    float(cumulative[round_index, column]))
+                                   for column, (measure, name, uom) in enumerate(selected)]
+        return summaries
+
+    def write_report(self, directory, name, bin_meter=DEFAULT_BIN_METER, start_meter=None, end_meter=None):
+        """Writes <name>_sections.csv, <name>_chainage.csv and both tables to <name>.json, returns the JSON path."""
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        section_rows = self.get_section_rows(start_meter, end_meter)
+        chainage_rows = self.get_chainage_rows(bin_meter, start_meter, end_meter)
+        write_csv(os.path.join(directory, name + '_sections.csv'), SECTION_COLUMNS, section_rows)
+        write_csv(os.path.join(directory, name + '_chainage.csv'), CHAINAGE_COLUMNS, chainage_rows)
+        json_path = os.path.join(directory, name + '.json')
+        with io.open(json_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'rounds': len(self.round_ids),
+                'measures': len(self.quantities),
+                'skipped_rounds': self.skipped_round_count,
+                'start_meter': start_meter,
+                'end_meter': end_meter,
+                'bin_meter': bin_meter,
+                'sections': [dict(zip(SECTION_COLUMNS, row)) for row in section_rows],
+                'chainage': [dict(zip(CHAINAGE_COLUMNS, row)) for row in chainage_rows],
+            }, indent=2, ensure_ascii=False))
+        return json_path
+
+    def _sum_by_group(self, groups, mask, group_count):
+        """Group x measure definition matrix of quantities for the masked rounds, groups given per masked round."""
+        return self._bincount_by_group(groups, mask, group_count, self.quantities)
+
+    def _count_by_group(self, groups, mask, group_count):
+        return self._bincount_by_group(groups, mask, group_count, None)
+
+    def _bincount_by_group(self, groups, mask, group_count, weights):
+        measure_count = len(self.measures)
+        # Group of every round, -1 for rounds outside the mask
+        round_groups = numpy.full(len(self.round_ids), -1, dtype=numpy.intp)
+        round_groups[mask] = groups
+        measure_groups = round_groups[self.measure_rounds]
+        selected = measure_groups >= 0
+        return numpy.bincount(measure_groups[selected] * measure_count + self.measure_definitions[selected],
+                              weights=None if weights is None else weights[selected],
+                              minlength=group_count * measure_count).reshape(group_count, measure_count)
+
+
+def to_quantity(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    # NaN compares unequal to itself
+    return value if value == value else None
+
+
+def write_csv(file_path, columns, rows):
+    with io.open(file_path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(rows)
@@ -0,0 +1,106 @@
+import json
+import os
+
+
+NDJSON_EXTENSION = '.ndjson'
+JSON_EXTENSION = '.json'
+# Snapshots are written under this suffix and renamed once complete
+TEMPORARY_SUFFIX = '.tmp'
+
+
+class SnapshotWriter:
+    """Writes a TIMS snapshot as NDJSON, one line per round carrying its section metadata.
+
+    The file only appears under its name once closed, so readers, e.g. an incremental sync looking for the newest
+    snapshot, never see a partial one. Leaving the with block on an error discards it.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.temporary_path = file_path + TEMPORARY_SUFFIX
+        self.file = open(self.temporary_path, 'w')
+
+    def write_round(self, section_id, section_name, round):
+        record = {'section': {'id': section_id, 'name': section_name}, 'round': round}
+        self.file.write(json.dumps(record, ensure_ascii=True))
+        self.file.write('\n')
+
+    def write_data(self, data):
+        for section in data['sections']:
+            for round in section['rounds']:
+                self.write_round(section['id'], section['name'], round)
+
+    def close(self):
+        self.file.close()
+        os.replace(self.temporary_path, self.file_path)
+
+    def discard(self):
+        self.file.close()
+        os.remove(self.temporary_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+
+def iterate_rounds(file_path):
+    """Yields (section, round) dicts from an NDJSON snapshot or a single-document JSON snapshot."""
+    with open(file_path, 'r') as f:
+        first_line = f.readline()
+        while first_line and not first_line.strip():
+            first_line = f.readline()
+        if not first_line:
+            # Empty snapshots hold no rounds
+            return
+        record = parse_line(first_line)
+        if record is None or 'sections' in record:
+            # Single-document snapshots are parsed at once
+            data = json.loads(first_line + f.read())
+            for section in data['sections']:
+                section_metadata = {'id': section['id'], 'name': section['name']}
+                for round in section['rounds']:
+                    yield section_metadata, round
+            return
+        yield record['section'], record['round']
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                yield record['section'], record['round']
+
+
+def parse_line(line):
+    try:
+        return json.loads(line)
+    except ValueError:
+        return None
+
+
+def write_document(file_path, data):
+    """Writes the {"sections": [...]} document as a single-document JSON snapshot, renamed once complete."""
+    temporary_path = file_path + TEMPORARY_SUFFIX
+    try:
+        with open(temporary_path, 'w') as f:
+            json.dump(data, f, ensure_ascii=True)
+    except Exception:
+        os.remove(temporary_path)
+        raise
+    os.replace(temporary_path, file_path)
+
+
+def read_snapshot(file_path):
+    """Reads a snapshot of either format into the {"sections": [...]} document."""
+    sections = []
+    sections_by_id = {}
+    for section_metadata, round in iterate_rounds(file_path):
+        section = sections_by_id.get(section_metadata['id'])
+        if section is None:
+            section = {'id': section_metadata['id'], 'name': section_metadata['name'], 'rounds': []}
+            sections_by_id[section['id']] = section
+            sections.append(section)
+        section['rounds'].append(round)
+    return {'sections': sections}
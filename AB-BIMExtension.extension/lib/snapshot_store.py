@@ -0,0 +1,172 @@
+import os
+
+try:
+    import sqlite3
+except ImportError:
+    # IronPython engines without IronPython.SQLite cannot open stores, snapshot files still work there
+    sqlite3 = None
+
+import snapshot
+
+
+SQLITE_EXTENSION = '.sqlite'
+
+ROUND_COLUMNS = ['id', 'start_meter', 'end_meter', 'cross_section_type', 'comment', 'start_datetime', 'end_datetime',
+                 'duration']
+
+# Values are stored as they come, columns without a declared type keep 5 and 5.0 apart
+SCHEMA = [
+    'CREATE TABLE IF NOT EXISTS sections (id INTEGER PRIMARY KEY, name TEXT)',
+    'CREATE TABLE IF NOT EXISTS rounds (id PRIMARY KEY, section_id INTEGER NOT NULL, start_meter, end_meter, '
+    'cross_section_type TEXT, comment TEXT, start_datetime TEXT, end_datetime TEXT, duration TEXT, '
+    'start_time TEXT, end_time TEXT)',
+    'CREATE TABLE IF NOT EXISTS measures (round_id NOT NULL, position INTEGER NOT NULL, name TEXT, '
+    'value_type TEXT, value, PRIMARY KEY (round_id, position))',
+    'CREATE INDEX IF NOT EXISTS rounds_section ON rounds (section_id, start_meter)',
+    'CREATE INDEX IF NOT EXISTS rounds_chainage ON rounds (start_meter, end_meter)',
+    'CREATE INDEX IF NOT EXISTS rounds_time ON rounds (start_time, end_time)',
+]
+
+
+def is_available():
+    return sqlite3 is not None
+
+
+class SnapshotStore:
+    """Sections, rounds and their measures in one SQLite file, upserted by the loader and queried by window.
+
+    Takes the place of SnapshotWriter: write_round and write_data upsert instead of appending.
+    """
+
+    def __init__(self, file_path):
+        if sqlite3 is None:
+            raise Exception("SQLite is not available in this Python engine, export the store to a snapshot file")
+        self.file_path = file_path
+        self.connection = sqlite3.connect(file_path)
+        for statement in SCHEMA:
+            self.connection.execute(statement)
+
+    def write_round(self, section_id, section_name, round):
+        self.connection.execute('INSERT OR REPLACE INTO sections (id, name) VALUES (?, ?)', (section_id, section_name))
+        self.connection.execute(
+            'INSERT OR REPLACE INTO rounds (id, section_id, start_meter, end_meter, cross_section_type, comment, '
+            'start_datetime, end_datetime, duration, start_time, end_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (round['id'], section_id, round['start_meter'], round['end_meter'], round['cross_section_type'],
+             round['comment'], round['start_datetime'], round['end_datetime'], round['duration'],
+             to_sortable_time(round['start_datetime']), to_sortable_time(round['end_datetime'])))
+        self.connection.execute('DELETE FROM measures WHERE round_id = ?', (round['id'],))
+        self.connection.executemany(
+            'INSERT INTO measures (round_id, position, name, value_type, value) VALUES (?, ?, ?, ?, ?)',
+            [(round['id'], position, item['name'], item['value_type'], item['value'])
+             for position, item in enumerate(round['material'])])
+
+    def write_data(self, data):
+        for section in data['sections']:
+            for round in section['rounds']:
+                self.write_round(section['id'], section['name'], round)
+
+    def iterate_rounds(self, section_ids=None, start_meter=None, end_meter=None, start_time=None, end_time=None,
+                       cross_section_types=None):
+        """Yields (section, round) dicts like snapshot.iterate_rounds, for rounds overlapping the given windows.
+
+        start_time and end_time are datetime.datetime values, rounds starting at end_time are outside the window.
+        cross_section_types are names like 'Kalotte'.
+        """
+        conditions, parameters = create_conditions(section_ids, start_meter, end_meter, start_time, end_time,
+                                                   cross_section_types)
+        where = ' WHERE ' + ' AND '.join(conditions) if conditions else ''
+        order = ' ORDER BY r.section_id, r.start_meter, r.id'
+        rounds = self.connection.execute(
+            'SELECT s.id, s.name, ' + ', '.join('r.' + column for column in ROUND_COLUMNS) +
+            ' FROM rounds r JOIN sections s ON s.id = r.section_id' + where + order, parameters)
+        # Measures of the window in the same order, merged into the rounds in one pass
+        measures = self.connection.execute(
+            'SELECT m.round_id, m.name, m.value_type, m.value FROM measures m JOIN rounds r ON r.id = m.round_id' +
+            where + order + ', m.position', parameters)
+        measure = next(measures, None)
+        for row in rounds:
+            round = dict(zip(ROUND_COLUMNS, row[2:]))
+            round['material'] = []
+            while measure is not None and measure[0] == round['id']:
+                round['material'].append({'name': measure[1], 'value_type': measure[2], 'value': measure[3]})
+                measure = next(measures, None)
+            yield {'id': row[0], 'name': row[1]}, round
+
+    def import_snapshot(self, file_path):
+        """Upserts every round of a JSON or NDJSON snapshot file."""
+        for section, round in snapshot.iterate_rounds(file_path):
+            self.write_round(section['id'], section['name'], round)
+        self.commit()
+
+    def export_snapshot(self, file_path, **window):
+        """Writes the rounds in the window to a snapshot file, NDJSON or JSON by its extension."""
+        if file_path.endswith(snapshot.NDJSON_EXTENSION):
+            with snapshot.SnapshotWriter(file_path) as snapshot_writer:
+                for section, round in self.iterate_rounds(**window):
+                    snapshot_writer.write_round(section['id'], section['name'], round)
+            return
+        sections = []
+        for section, round in self.iterate_rounds(**window):
+            if not sections or sections[-1]['id'] != section['id']:
+                sections.append({'id': section['id'], 'name': section['name'], 'rounds': []})
+            sections[-1]['rounds'].append(round)
+        snapshot.write_document(file_path, {'sections': sections})
+
+    def __len__(self):
+        return self.connection.execute('SELECT COUNT(*) FROM rounds').fetchone()[0]
+
+    def commit(self):
+        self.connection.commit()
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def iterate_rounds(file_path, **window):
+    """Yields (section, round) dicts of a store like snapshot.iterate_rounds does for snapshot files."""
+    if not os.path.isfile(file_path):
+        raise Exception("Snapshot store not found", file_path)
+    with SnapshotStore(file_path) as store:
+        for section, round in store.iterate_rounds(**window):
+            yield section, round
+
+
+def create_conditions(section_ids, start_meter, end_meter, start_time, end_time, cross_section_types=None):
+    conditions = []
+    parameters = []
+    if section_ids:
+        conditions.append('r.section_id IN ({})'.format(', '.join('?' * len(section_ids))))
+        parameters.extend(section_ids)
+    if cross_section_types:
+        conditions.append('r.cross_section_type IN ({})'.format(', '.join('?' * len(cross_section_types))))
+        parameters.extend(cross_section_types)
+    if start_meter is not None:
+        conditions.append('r.end_meter >= ?')
+        parameters.append(start_meter)
+    if end_meter is not None:
+        conditions.append('r.start_meter <= ?')
+        parameters.append(end_meter)
+    if start_time is not None:
+        conditions.append('r.end_time >= ?')
+        parameters.append(start_time.strftime('%Y-%m-%dT%H:%M'))
+    if end_time is not None:
+        conditions.append('r.start_time < ?')
+        parameters.append(end_time.strftime('%Y-%m-%dT%H:%M'))
+    return conditions, parameters
+
+
+def to_sortable_time(value):
+    """Turns the 'd.m.Y H:M' round times of snapshots into 'Y-m-dTH:M', which sorts chronologically."""
+    if not value:
+        return None
+    date, time = value.split(' ')
+    day, month, year = date.split('.')
+    hour, minute = time.split(':')
+    return '{:04d}-{:02d}-{:02d}T{:02d}:{:02d}'.format(int(year), int(month), int(day), int(hour), int(minute))
@@ -0,0 +1,606 @@
+# -*- coding: utf-8 -*-
+"""In-memory stand-in for the Revit, rpw and pyRevit surfaces the Generate Model pushbutton uses.
+
+install() registers the fake modules and the __revit__ builtin, so the pushbutton modules import outside Revit.
+"""
+import math
+import sys
+import types
+
+try:
+    import builtins
+except ImportError:
+    import __builtin__ as builtins
+
+AS_DESIGNED_FAMILY_NAME = 'EBO'
+AS_DESIGNED_PARAMETERS = ['Blocknummer', 'Station Anfang', 'Station Ende', 'Gradientenhöhe_A', 'Gradientenhöhe_B',
+                          'Querneigung', 'rotXY_A', 'rotXY_B']
+DEGREE_UNIT = 'autodesk.unit.unit:degrees'
+
+
+class ElementId:
+    def __init__(self, value):
+        self.IntegerValue = value
+
+    def __eq__(self, other):
+        return isinstance(other, ElementId) and other.IntegerValue == self.IntegerValue
+
+    def __hash__(self):
+        return hash(self.IntegerValue)
+
+
+class Definition:
+    def __init__(self, name):
+        self.Name = name
+
+
+class Parameter:
+    def __init__(self, name, value=None, value_string=None):
+        self.Definition = Definition(name)
+        self.value = value
+        self.value_string = value_string
+
+    def Set(self, value):
+        self.value = value
+        self.value_string = None
+        return True
+
+    def AsValueString(self):
+        if self.value_string is not None:
+            return self.value_string
+        return None if self.value is None else str(self.value)
+
+    def AsString(self):
+        return None if self.value is None else str(self.value)
+
+    def AsDouble(self):
+        return self.value
+
+
+class RevitType:
+    """What element.GetType() returns: prints as the .NET class name."""
+
+    def __init__(self, name):
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class Element(object):
+    revit_class = 'Element'
+
+    def __init__(self, document, name):
+        self.document = document
+        self.Id = document.add(self)
+        self.Name = name
+        self.Parameters = []
+
+    @property
+    def name(self):
+        # rpw wrappers expose the Revit name as .name
+        return self.Name
+
+    @property
+    def UniqueId(self):
+        return 'fake-{}'.format(self.Id.IntegerValue)
+
+    def GetType(self):
+        return RevitType('Autodesk.Revit.DB.' + self.revit_class)
+
+    def add_parameter(self, name, value=None, value_string=None):
+        self.Parameters.append(Parameter(name, value, value_string))
+
+    def LookupParameter(self, name):
+        for p in self.Parameters:
+            if p.Definition.Name == name:
+                return p
+        return None
+
+
+class Family(Element):
+    revit_class = 'Family'
+
+    def __init__(self, document, name, parameter_names, type_parameter_names=()):
+        super(Family, self).__init__(document, name)
+        self.parameter_names = list(parameter_names)
+        self.type_parameter_names = list(type_parameter_names)
+        self.IsEditable = True
+
+    def GetFamilySymbolIds(self):
+        return [symbol.Id for symbol in self.get_symbols()]
+
+    def get_symbols(self):
+        return [symbol for symbol in self.document.elements_of('FamilySymbol') if symbol.Family is self]
+
+    def get_instances(self):
+        return [instance for instance in self.document.elements_of('FamilyInstance') if instance.Symbol.Family is self]
+
+    def get_state(self):
+        return {
+            'parameter_names': list(self.parameter_names),
+            'type_parameter_names': list(self.type_parameter_names),
+            'type_values': dict((symbol.Name, dict((p.Definition.Name, p.value) for p in symbol.Parameters))
+                                for symbol in self.get_symbols()),
+        }
+
+    def apply_state(self, state):
+        """Takes over the parameters and types of a loaded family document, keeping existing instances."""
+        self.parameter_names = list(state['parameter_names'])
+        self.type_parameter_names = list(state['type_parameter_names'])
+        symbols = dict((symbol.Name, symbol) for symbol in self.get_symbols())
+        for type_name, values in state['type_values'].items():
+            symbol = symbols.get(type_name) or FamilySymbol(self.document, self, type_name)
+            symbol.Parameters = [Parameter(name, values.get(name)) for name in self.type_parameter_names]
+        for instance in self.get_instances():
+            instance.add_missing_parameters()
+
+
+class FamilySymbol(Element):
+    revit_class = 'FamilySymbol'
+
+    def __init__(self, document, family, name):
+        super(FamilySymbol, self).__init__(document, name)
+        self.Family = family
+        self.IsActive = False
+
+    def Activate(self):
+        self.IsActive = True
+
+
+class FamilyInstance(Element):
+    revit_class = 'FamilyInstance'
+
+    def __init__(self, document, symbol):
+        super(FamilyInstance, self).__init__(document, symbol.Name)
+        self.Symbol = symbol
+        self.add_missing_parameters()
+
+    def add_missing_parameters(self):
+        existing_names = set(p.Definition.Name for p in self.Parameters)
+        for parameter_name in self.Symbol.Family.parameter_names:
+            if parameter_name not in existing_names:
+                self.add_parameter(parameter_name)
+
+    def ChangeTypeId(self, type_id):
+        self.document.require_modifiable()
+        self.Symbol = self.document.GetElement(type_id)
+        self.Name = self.Symbol.Name
+        self.add_missing_parameters()
+        return self.Id
+
+
+class CurveByPoints(Element):
+    revit_class = 'CurveByPoints'
+
+    def __init__(self, document, name='Tunnelachse'):
+        super(CurveByPoints, self).__init__(document, name)
+        self.GeometryCurve = types.SimpleNamespace(Reference=types.SimpleNamespace(ElementId=self.Id))
+
+
+class PlacementPoint(Element):
+    revit_class = 'ReferencePoint'
+
+    def __init__(self, document):
+        super(PlacementPoint, self).__init__(document, 'Placement point')
+        self.reference = None
+
+    def SetPointElementReference(self, reference):
+        self.reference = reference
+
+    def GetPointElementReference(self):
+        return self.reference
+
+
+class PointOnEdge:
+    def __init__(self, edge_reference, location):
+        self.edge_reference = edge_reference
+        self.location = location
+
+    def GetEdgeReference(self):
+        return self.edge_reference
+
+
+class FamilyParameter:
+    def __init__(self, name, is_instance):
+        self.Definition = Definition(name)
+        self.IsInstance = is_instance
+
+
+class FamilyType:
+    def __init__(self, name, values):
+        self.Name = name
+        self.values = values
+
+
+class FamilyManager:
+    def __init__(self, family_document, state):
+        self.family_document = family_document
+        self.Parameters = [FamilyParameter(name, True) for name in state['parameter_names']] + \
+                          [FamilyParameter(name, False) for name in state['type_parameter_names']]
+        self.Types = [FamilyType(name, dict(values)) for name, values in state['type_values'].items()]
+        self.CurrentType = self.Types[0] if self.Types else None
+
+    def AddParameter(self, name, group, parameter_type, is_instance):
+        self.family_document.require_modifiable()
+        if name in [p.Definition.Name for p in self.Parameters]:
+            raise Exception('Parameter {} already exists'.format(name))
+        parameter = FamilyParameter(name, is_instance)
+        self.Parameters.append(parameter)
+        return parameter
+
+    def Set(self, parameter, value):
+        self.family_document.require_modifiable()
+        if parameter.IsInstance:
+            raise Exception('Instance parameter values are set per instance')
+        self.CurrentType.values[parameter.Definition.Name] = value
+
+    def get_state(self):
+        return {
+            'parameter_names': [p.Definition.Name for p in self.Parameters if p.IsInstance],
+            'type_parameter_names': [p.Definition.Name for p in self.Parameters if not p.IsInstance],
+            'type_values': dict((family_type.Name, dict(family_type.values)) for family_type in self.Types),
+        }
+
+
+class FakeDocument:
+    def __init__(self, path_name='C:\\Projekte\\Tunnel.rvt'):
+        self.PathName = path_name
+        self.Title = path_name.split('\\')[-1]
+        self.IsFamilyDocument = False
+        self.Application = FakeApplication()
+        self.saved_families = {}
+        self.transaction_count = 0
+        self.family_edits = 0
+        self.version = 1
+        self._elements = {}
+        self._next_id = 1000
+        self._open_transactions = 0
+
+    @property
+    def IsModifiable(self):
+        return self._open_transactions > 0
+
+    def add(self, element):
+        element_id = ElementId(self._next_id)
+        self._next_id += 1
+        self._elements[element_id.IntegerValue] = element
+        return element_id
+
+    def GetElement(self, element_id):
+        return self._elements.get(element_id.IntegerValue)
+
+    def elements_of(self, revit_class):
+        return [e for e in self._elements.values() if e.revit_class == revit_class]
+
+    def elements_of_classes(self, revit_classes):
+        return [e for e in self._elements.values() if e.revit_class in revit_classes]
+
+    def require_modifiable(self):
+        if not self.IsModifiable:
+            raise Exception('Attempt to modify the model outside of a transaction')
+
+    def EditFamily(self, family):
+        if self.IsModifiable:
+            raise Exception('Families cannot be edited while a transaction is open')
+        self.family_edits += 1
+        return FakeFamilyDocument(self, family)
+
+    def LoadFamily(self, file_name, options=None):
+        self.require_modifiable()
+        saved = self.saved_families.get(file_name)
+        if saved is None:
+            raise Exception('Family file {} not found'.format(file_name))
+        family_name = file_name.rsplit('.', 1)[0]
+        existing = [f for f in self.elements_of('Family') if f.Name == family_name]
+        if existing and options is None:
+            return False
+        self.load_family_state(existing[0] if existing else Family(self, family_name, []), saved)
+        return True
+
+    def load_family_state(self, family, state):
+        family.apply_state(state)
+        self.version += 1
+        return family
+
+
+class FakeFamilyDocument:
+    def __init__(self, project_document, family):
+        self.project_document = project_document
+        self.family = family
+        self.IsFamilyDocument = True
+        self.FamilyManager = FamilyManager(self, family.get_state())
+        self._open_transactions = 0
+
+    @property
+    def IsModifiable(self):
+        return self._open_transactions > 0
+
+    def require_modifiable(self):
+        if not self.IsModifiable:
+            raise Exception('Attempt to modify the family outside of a transaction')
+
+    def SaveAs(self, file_name, options=None):
+        self.project_document.saved_families[file_name] = self.FamilyManager.get_state()
+
+    def LoadFamily(self, project_document, options):
+        if project_document.IsModifiable:
+            raise Exception('Families cannot be loaded while a transaction is open')
+        project_document.load_family_state(self.family, self.FamilyManager.get_state())
+        return self.family
+
+    def Close(self, save_modified=False):
+        pass
+
+
+class FakeApplication:
+    def __init__(self):
+        self.Create = self
+        self.point_count = 0
+
+    def NewPointOnEdge(self, reference, location):
+        self.point_count += 1
+        return PointOnEdge(reference, location)
+
+
+class Transaction:
+    def __init__(self, document):
+        self.document = document
+        self.started = False
+        self.ended = False
+
+    def Start(self, name=None):
+        if self.started and not self.ended:
+            raise Exception('Transaction already started')
+        if self.document.IsModifiable and not isinstance(self, SubTransaction):
+            raise Exception('Another transaction is already open')
+        self.started = True
+        self.ended = False
+        self.document._open_transactions += 1
+
+    def Commit(self):
+        self._end()
+        if not isinstance(self, SubTransaction) and hasattr(self.document, 'transaction_count'):
+            self.document.transaction_count += 1
+
+    def RollBack(self):
+        self._end()
+
+    def HasStarted(self):
+        return self.started
+
+    def HasEnded(self):
+        return self.ended
+
+    def _end(self):
+        if not self.started or self.ended:
+            raise Exception('Transaction is not open')
+        self.ended = True
+        self.document._open_transactions -= 1
+
+
+class SubTransaction(Transaction):
+    def Start(self, name=None):
+        if not self.document.IsModifiable:
+            raise Exception('Sub-transactions need an open transaction')
+        Transaction.Start(self)
+
+
+class FilteredElementCollector:
+    def __init__(self, document):
+        self.document = document
+        self.classes = None
+
+    def OfClass(self, revit_class):
+        self.classes = revit_class.revit_classes
+        return self
+
+    def WhereElementIsNotElementType(self):
+        return self
+
+    def ToElementIds(self):
+        return [e.Id for e in self.ToElements()]
+
+    def ToElements(self):
+        if self.classes is None:
+            return [e for e in self.document._elements.values() if e.revit_class != 'FamilySymbol']
+        return self.document.elements_of_classes(self.classes)
+
+    def __iter__(self):
+        return iter(self.ToElements())
+
+
+class AdaptiveComponentInstanceUtils:
+    @staticmethod
+    def CreateAdaptiveComponentInstance(document, symbol):
+        document.require_modifiable()
+        instance = FamilyInstance(document, symbol)
+        instance.placement_point_ids = [PlacementPoint(document).Id, PlacementPoint(document).Id]
+        return instance
+
+    @staticmethod
+    def GetInstancePlacementPointElementRefIds(instance):
+        return instance.placement_point_ids
+
+
+class ElementTransformUtils:
+    @staticmethod
+    def CopyElement(document, element_id, translation):
+        document.require_modifiable()
+        original = document.GetElement(element_id)
+        return [type(original)(document, original.Name).Id]
+
+
+class PointLocationOnCurve:
+    def __init__(self, measurement_type, parameter, measure_from):
+        self.parameter = parameter
+
+
+class UnitUtils:
+    @staticmethod
+    def GetAllUnits():
+        return ['autodesk.unit.unit:meters', 'autodesk.unit.unit:millimeters', DEGREE_UNIT]
+
+    @staticmethod
+    def GetTypeCatalogStringForUnit(unit):
+        return 'DEGREES' if unit == DEGREE_UNIT else unit.split(':')[-1].upper()
+
+    @staticmethod
+    def ConvertToInternalUnits(value, unit):
+        return math.radians(value) if unit == DEGREE_UNIT else value
+
+
+class DocumentVersion:
+    def __init__(self, document):
+        self.VersionGUID = 'version-{}'.format(document.version)
+        self.NumberOfSaves = document.version
+
+
+class DocumentApi:
+    @staticmethod
+    def GetDocumentVersion(document):
+        return DocumentVersion(document)
+
+
+class Collector:
+    """rpw.db.Collector"""
+
+    def __init__(self, of_class=None):
+        self.of_class = of_class
+
+    def get_elements(self):
+        return active_document.elements_of(self.of_class)
+
+
+def create_db_module():
+    db_module = types.ModuleType('Autodesk.Revit.DB')
+    db_module.Transaction = Transaction
+    db_module.ElementId = ElementId
+    db_module.SubTransaction = SubTransaction
+    db_module.FilteredElementCollector = FilteredElementCollector
+    db_module.AdaptiveComponentInstanceUtils = AdaptiveComponentInstanceUtils
+    db_module.ElementTransformUtils = ElementTransformUtils
+    db_module.PointLocationOnCurve = PointLocationOnCurve
+    db_module.UnitUtils = UnitUtils
+    db_module.Document = DocumentApi
+    db_module.CurveElement = type('CurveElement', (), {'revit_classes': ['CurveByPoints', 'ModelCurve']})
+    db_module.CurveByPoints = type('CurveByPoints', (), {'revit_classes': ['CurveByPoints']})
+    db_module.FamilyInstance = type('FamilyInstance', (), {'revit_classes': ['FamilyInstance']})
+    db_module.FamilySymbol = type('FamilySymbol', (), {'revit_classes': ['FamilySymbol']})
+    db_module.Family = type('Family', (), {'revit_classes': ['Family']})
+    db_module.XYZ = lambda x, y, z: (x, y, z)
+    db_module.SaveAsOptions = type('SaveAsOptions', (), {'OverwriteExistingFile': False})
+    db_module.IFamilyLoadOptions = object
+    db_module.FamilySource = types.SimpleNamespace(Family='Family', Project='Project')
+    db_module.ParameterType = types.SimpleNamespace(Text='Text', Integer='Integer')
+    db_module.BuiltInParameterGroup = types.SimpleNamespace(PG_IDENTITY_DATA='PG_IDENTITY_DATA')
+    db_module.PointOnCurveMeasurementType = types.SimpleNamespace(SegmentLength='SegmentLength')
+    db_module.PointOnCurveMeasureFrom = types.SimpleNamespace(Beginning='Beginning')
+    return db_module
+
+
+def create_ui_module():
+    ui_module = types.ModuleType('Autodesk.Revit.UI')
+    ui_module.RevitCommandId = types.SimpleNamespace(LookupCommandId=lambda name: name)
+    ui_module.UIApplication = lambda application: types.SimpleNamespace(PostCommand=lambda command_id: None)
+    return ui_module
+
+
+class Forms:
+    """Answers the pushbutton's dialogs without user interaction."""
+
+    def __init__(self):
+        self.snapshot_path = None
+        self.selected_items = None
+
+    def TextInput(self, title, default=None, description=None):
+        return default
+
+    def Alert(self, content, title=None, header=None, exit=False):
+        self.last_alert = (content, title, header)
+
+    def SelectFromList(self, title, options, *args, **kwargs):
+        return options[0] if self.selected_items is None else self.selected_items
+
+    def show(self, options, multiselect=False, *args, **kwargs):
+        """pyrevit.forms.SelectFromList.show, selecting every option unless selected_items is set."""
+        if self.selected_items is not None:
+            return self.selected_items
+        return list(options) if multiselect else options[0]
+
+    def switch(self, options, *args, **kwargs):
+        """pyrevit.forms.CommandSwitchWindow.show, switching to the first option."""
+        return options[0]
+
+    def pick_file(self, *args, **kwargs):
+        return self.snapshot_path
+
+
+forms = Forms()
+active_document = None
+
+
+def install(document):
+    """Registers the fake modules for document and returns the Forms answering dialogs."""
+    global active_document
+    active_document = document
+    autodesk = types.ModuleType('Autodesk')
+    revit = types.ModuleType('Autodesk.Revit')
+    revit.DB = create_db_module()
+    revit.UI = create_ui_module()
+    autodesk.Revit = revit
+    rpw = types.ModuleType('rpw')
+    rpw.db = types.ModuleType('rpw.db')
+    rpw.db.Collector = Collector
+    rpw.ui = types.ModuleType('rpw.ui')
+    rpw.ui.forms = types.ModuleType('rpw.ui.forms')
+    rpw.ui.forms.TextInput = forms.TextInput
+    rpw.ui.forms.Alert = forms.Alert
+    rpw.ui.forms.SelectFromList = forms.SelectFromList
+    pyrevit = types.ModuleType('pyrevit')
+    pyrevit.forms = types.ModuleType('pyrevit.forms')
+    pyrevit.forms.pick_file = forms.pick_file
+    pyrevit.forms.SelectFromList = types.SimpleNamespace(show=forms.show)
+    pyrevit.forms.CommandSwitchWindow = types.SimpleNamespace(show=forms.switch)
+    pyrevit.script = types.ModuleType('pyrevit.script')
+    pyrevit.script.get_output = lambda: types.SimpleNamespace(print_table=lambda *args, **kwargs: None,
+                                                              print_md=lambda *args, **kwargs: None)
+    modules = {
+        'Autodesk': autodesk, 'Autodesk.Revit': revit, 'Autodesk.Revit.DB': revit.DB, 'Autodesk.Revit.UI': revit.UI,
+        'rpw': rpw, 'rpw.db': rpw.db, 'rpw.ui': rpw.ui, 'rpw.ui.forms': rpw.ui.forms,
+        'pyrevit': pyrevit, 'pyrevit.forms': pyrevit.forms, 'pyrevit.script': pyrevit.script,
+    }
+    sys.modules.update(modules)
+    ui_document = types.SimpleNamespace(Document=document)
+    builtins.__revit__ = types.SimpleNamespace(ActiveUIDocument=ui_document, Application=document.Application)
+    return forms
+
+
+def create_as_designed_document(block_count, type_names=('EBO_K',), families=None):
+    """A project with block_count numbered blocks per as-designed family and a tunnel axis.
+
+    families lists (family name, type names) pairs, by default one family with type_names.
+    """
+    document = FakeDocument()
+    for family_name, family_type_names in families or [(AS_DESIGNED_FAMILY_NAME, type_names)]:
+        create_as_designed_blocks(document, family_name, family_type_names, block_count)
+    CurveByPoints(document)
+    return document
+
+
+def create_as_designed_blocks(document, family_name, type_names, block_count):
+    family = Family(document, family_name, AS_DESIGNED_PARAMETERS)
+    symbols = [FamilySymbol(document, family, type_name) for type_name in type_names]
+    for blocknummer in range(1, block_count + 1):
+        instance = FamilyInstance(document, symbols[blocknummer % len(symbols)])
+        values = {
+            'Blocknummer': (blocknummer, str(blocknummer)),
+            'Gradientenhöhe_A': (None, '{:.1f} mm'.format(500.0 + blocknummer * 0.2)),
+            'Gradientenhöhe_B': (None, '{:.1f} mm'.format(500.2 + blocknummer * 0.2)),
+            'Querneigung': (None, '{:.2f}°'.format(2.5)),
+            'rotXY_A': (None, '{:.3f}°'.format(blocknummer * 0.01 % 360)),
+            'rotXY_B': (None, '{:.3f}°'.format((blocknummer + 1) * 0.01 % 360)),
+        }
+        for p in instance.Parameters:
+            if p.Definition.Name in values:
+                p.value, p.value_string = values[p.Definition.Name]
@@ -0,0 +1,119 @@
+"""Compares memory, build and serialization time of snapshot dicts, slotted records and the RoundTable.
+
+Every representation is built from the same JSON text and serialized back to it.
+
+Usage: python benchmarks/round_table_benchmark.py [round counts...]
+"""
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+LOADER_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'AB-BIMExtension.extension',
+                                'As-Built Tunnel BIM.tab', 'Model Data.panel', 'Load Data from TIMS.pushbutton')
+sys.path.insert(0, LOADER_DIRECTORY)
+
+from material import Material  # noqa: E402
+from round import Round  # noqa: E402
+from round_table import RoundTable  # noqa: E402
+
+MEASURES = [
+    ('Spritzbeton Kalotte und Strosse', 'm³'),
+    ('Spritzbeton Ortsbrust', 'm³'),
+    ('SN Mörtelanker', 'Stk'),
+    ('Baustahlgitter 1. Lage, mit Bogen', 'm²'),
+    ('Bogen', 'Stk'),
+    ('Sprengstoff', 'kg'),
+]
+
+
+def create_snapshot(round_count, rounds_per_section=2000):
+    random_generator = random.Random(round_count)
+    sections = []
+    for index in range(round_count):
+        if index % rounds_per_section == 0:
+            sections.append({'id': len(sections) + 1, 'name': 'Section {}'.format(len(sections) + 1), 'rounds': []})
+        start_meter = round(index * 1.3, 2)
+        sections[-1]['rounds'].append({
+            'id': index + 1,
+            'start_meter': start_meter,
+            'end_meter': round(start_meter + 1.3, 2),
+            'cross_section_type': 'Kalotte',
+            'comment': '',
+            'start_datetime': '{}.{}.2021 {}:{}'.format(index % 28 + 1, index % 12 + 1, index % 24, index % 60),
+            'end_datetime': '{}.{}.2021 {}:{}'.format(index % 28 + 1, index % 12 + 1, (index + 3) % 24, index % 60),
+            'duration': '{}h'.format(random_generator.randint(2, 9)),
+            'material': [{'name': name, 'value_type': unit, 'value': round(random_generator.uniform(0, 20), 2)}
+                         for name, unit in MEASURES],
+        })
+    return sections
+
+
+def create_records(data):
+    sections = []
+    for section in data['sections']:
+        rounds = []
+        for item in section['rounds']:
+            round = Round(item['id'], item['start_meter'], item['end_meter'], item['cross_section_type'],
+                          item['comment'], item['start_datetime'], item['end_datetime'], item['duration'])
+            round.material = [Material(m['name'], m['value_type'], m['value']) for m in item['material']]
+            rounds.append(round)
+        sections.append((section['id'], section['name'], rounds))
+    return sections
+
+
+def records_to_snapshot(sections):
+    snapshot_sections = []
+    for section_id, section_name, rounds in sections:
+        snapshot_rounds = []
+        for round in rounds:
+            item = round.to_dict()
+            item['material'] = [material.to_dict() for material in round.material]
+            snapshot_rounds.append(item)
+        snapshot_sections.append({'id': section_id, 'name': section_name, 'rounds': snapshot_rounds})
+    return {'sections': snapshot_sections}
+
+
+def measure(function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    # Memory is traced in a second run so tracing does not distort the timing, the result is kept alive until the
+    # retained size is read
+    tracemalloc.start()
+    traced_result = function()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del traced_result
+    return result, elapsed, retained, peak
+
+
+def run(round_count):
+    document = json.dumps({'sections': create_snapshot(round_count)})
+    representations = [
+        ('snapshot dicts', lambda: json.loads(document), lambda dicts: dicts),
+        ('slotted records', lambda: create_records(json.loads(document)), records_to_snapshot),
+        ('round table', lambda: RoundTable.from_snapshot(json.loads(document)), RoundTable.to_snapshot),
+    ]
+    results = []
+    for name, build, to_snapshot in representations:
+        built, build_time, retained, peak = measure(build)
+        serialized, serialize_time, _, _ = measure(lambda: json.dumps(to_snapshot(built)))
+        assert serialized == document
+        results.append((name, retained, peak, build_time, serialize_time))
+    return results
+
+
+def main(round_counts):
+    print('{:>8} {:<16} {:>12} {:>10} {:>10} {:>12}'.format('rounds', 'representation', 'retained MB', 'peak MB',
+                                                        'build s', 'serialize s'))
+    for round_count in round_counts:
+        for name, retained, peak, build_time, serialize_time in run(round_count):
+            print('{:>8} {:<16} {:>12.1f} {:>10.1f} {:>10.3f} {:>12.3f}'.format(
+                round_count, name, retained / 1024.0 / 1024.0, peak / 1024.0 / 1024.0, build_time, serialize_time))
+
+
+if __name__ == '__main__':
+    main([int(argument) for argument in sys.argv[1:]] or [10000, 100000])
@@ -0,0 +1,205 @@
+"""Times the TIMS loader against a stub server and the model generation stages against a fake Revit document.
+
+Prints one JSON object per measurement and appends them to --output, so runs can be compared between changes.
+
+Usage: python benchmarks/run_benchmarks.py [--scales 1000 10000 100000] [--latency 0.005] [--output results.jsonl]
+"""
+import argparse
+import datetime
+import importlib.util
+import json
+import os
+import sys
+import tempfile
+import time
+import types
+from contextlib import redirect_stdout
+
+BENCHMARK_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+EXTENSION_DIRECTORY = os.path.join(os.path.dirname(BENCHMARK_DIRECTORY), 'AB-BIMExtension.extension')
+LIB_DIRECTORY = os.path.join(EXTENSION_DIRECTORY, 'lib')
+LOADER_DIRECTORY = os.path.join(EXTENSION_DIRECTORY, 'As-Built Tunnel BIM.tab', 'Model Data.panel',
+                                'Load Data from TIMS.pushbutton')
+GENERATOR_DIRECTORY = os.path.join(EXTENSION_DIRECTORY, 'As-Built Tunnel BIM.tab', 'Model Generation.panel',
+                                   'Generate Model.pushbutton')
+sys.path[:0] = [LIB_DIRECTORY, LOADER_DIRECTORY, GENERATOR_DIRECTORY]
+
+import fake_revit  # noqa: E402
+import snapshot  # noqa: E402
+from stub_tims_server import StubTimsServer  # noqa: E402
+from synthetic_tims import SyntheticTims, SyntheticClient, CROSS_SECTIONS, ROUND_LENGTH_METER  # noqa: E402
+
+DEFAULT_SCALES = [1000, 10000]
+# Per-round loading needs two requests per round, larger scales only time bulk mode
+PER_ROUND_MAX_SCALE = 1000
+# As-designed family and types the fake document models each cross section with
+AS_DESIGNED_FAMILIES = {
+    'Kalotte': ('EBO', ('EBO_K',)),
+    'Strosse': ('EBO Strosse', ('EBO_S',)),
+    'Sohle': ('EBO Sohle', ('EBO_So',)),
+}
+
+
+def import_script(name, directory):
+    specification = importlib.util.spec_from_file_location(name, os.path.join(directory, 'script.py'))
+    module = importlib.util.module_from_spec(specification)
+    specification.loader.exec_module(module)
+    return module
+
+
+def import_loader():
+    # The pushbutton reads the TIMS login from its gitignored credentials module
+    sys.modules.setdefault('credentials', types.SimpleNamespace(username='benchmark', password='benchmark'))
+    return import_script('tims_loader', LOADER_DIRECTORY)
+
+
+def import_generator(data_directory):
+    import utils
+    utils.get_data_directory = lambda: data_directory
+    return import_script('generate_model', GENERATOR_DIRECTORY)
+
+
+def benchmark_loader(loader, dataset, latency, max_workers, per_round_max_scale):
+    from tims_client import TimsClient
+    results = []
+    modes = [True] if dataset.round_count > per_round_max_scale else [True, False]
+    with StubTimsServer(dataset, latency) as server:
+        for bulk_mode in modes:
+            loader.BULK_MODE = bulk_mode
+            client = TimsClient(server.base_url, max_workers)
+            client.authenticate('benchmark', 'benchmark')
+            server.reset_counters()
+            start = time.perf_counter()
+            with redirect_stdout(open(os.devnull, 'w')):
+                loader.get_data(client)
+            seconds = time.perf_counter() - start
+            client.close()
+            results.append({
+                'benchmark': 'loader',
+                'mode': 'bulk' if bulk_mode else 'per_round',
+                'rounds': dataset.round_count,
+                'latency': latency,
+                'max_workers': max_workers,
+                'seconds': round(seconds, 4),
+                'requests': server.request_count,
+                'bytes': server.bytes_sent,
+            })
+    loader.BULK_MODE = True
+    return results
+
+
+def write_snapshot(loader, dataset, path):
+    with snapshot.SnapshotWriter(path) as snapshot_writer:
+        loader.stream_data(SyntheticClient(dataset), snapshot_writer)
+
+
+def benchmark_generator(round_count, snapshot_path, cross_sections=CROSS_SECTIONS[:1]):
+    # Block n spans chainage n - 1 to n, cover every round with a block
+    block_count = int(round_count / len(cross_sections) * ROUND_LENGTH_METER) + 2
+    document = fake_revit.create_as_designed_document(
+        block_count, families=[AS_DESIGNED_FAMILIES[cross_section] for cross_section in cross_sections])
+    forms = fake_revit.install(document)
+    forms.snapshot_path = snapshot_path
+    forms.selected_items = list(cross_sections)
+    stages = {}
+
+    def run_stage(name, function):
+        start = time.perf_counter()
+        with redirect_stdout(open(os.devnull, 'w')):
+            result = function()
+        stages[name] = round(time.perf_counter() - start, 4)
+        return result
+
+    # Checkpoints, caches and reports of benchmark runs stay out of the extension's data folder
+    data_directory = tempfile.mkdtemp()
+    counters = {}
+    for prefix in ('', 'rerun.'):
+        # Every pass imports the pushbutton afresh like a click in Revit. The rerun resumes from the families and
+        # rounds the first pass built, as a daily model update would, and warm starts from its document cache
+        generator = run_stage(prefix + 'import', lambda: import_generator(data_directory))
+        run_stage(prefix + 'load_warm_start_cache', generator.load_warm_start_cache)
+        as_designed_table = run_stage(prefix + 'export_as_designed_table', generator.export_as_designed_table)
+        cross_section_types = generator.select_cross_sections()
+        as_designed_families = run_stage(prefix + 'locate_as_designed_families',
+                                         lambda: generator.locate_as_designed_families(cross_section_types))
+        generator.generation_plan = generator.GenerationPlanner.GenerationPlan(
+            as_designed_table, generator.POSITION_MODE, generator.plan_cross_sections(as_designed_families))
+        run_stage(prefix + 'plan_construction_data',
+                  lambda: generator.plan_construction_data(generator.instrumentation.iterate(
+                      'load_construction_data', generator.load_construction_data(cross_section_types))))
+        run_stage(prefix + 'prepare_construction_families',
+                  lambda: generator.prepare_construction_families(as_designed_families,
+                                                                  generator.generation_plan.material_names))
+        generator.as_built_tunnel_curve = run_stage(prefix + 'create_tunnel_curve', generator.create_tunnel_curve)
+        generator.point_registry = generator.PointRegistry(
+            lambda position_meter: generator.create_new_point_on_edge(generator.as_built_tunnel_curve,
+                                                                      position_meter),
+            generator.POINT_TOLERANCE_METER)
+        generator.as_built_rounds = run_stage(prefix + 'index_as_built_rounds', generator.index_as_built_rounds)
+        run_stage(prefix + 'create_boundary_points', generator.create_boundary_points)
+        run_stage(prefix + 'apply_generation_plan', generator.apply_generation_plan)
+        run_stage(prefix + 'save_warm_start_cache', generator.save_warm_start_cache)
+        counters[prefix + 'counters'] = generator.instrumentation.counters
+        if not prefix:
+            round_spans = dict((name, span) for name, span in generator.instrumentation.spans.items()
+                               if name.startswith('add_tunnel_element'))
+    as_built_family_names = set(generator.AS_BUILT_FAMILY_NAMES.values())
+    created_rounds = [e for e in document.elements_of('FamilyInstance')
+                      if e.Symbol.Family.Name in as_built_family_names]
+    return {
+        'benchmark': 'generator',
+        'rounds': round_count,
+        'cross_sections': list(cross_sections),
+        'as_designed_blocks': len(as_designed_table),
+        'seconds': round(sum(stages.values()), 4),
+        'stages': stages,
+        'created_rounds': len(created_rounds),
+        'transactions': document.transaction_count,
+        'family_edits': document.family_edits,
+        'placement_points': document.Application.point_count,
+        'tunnel_curves': len(document.elements_of('CurveByPoints')),
+        'counters': counters['counters'],
+        'rerun_counters': counters['rerun.counters'],
+        'round_spans': round_spans,
+    }
+
+
+def main(arguments):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scales', type=int, nargs='+', default=DEFAULT_SCALES, help='round counts to benchmark')
+    parser.add_argument('--latency', type=float, default=0.0, help='stub server latency per request in seconds')
+    parser.add_argument('--max-workers', type=int, default=8, help='concurrent loader requests')
+    parser.add_argument('--per-round-max-scale', type=int, default=PER_ROUND_MAX_SCALE,
+                        help='largest round count the per-round loader mode is timed at')
+    parser.add_argument('--cross-sections', nargs='+', choices=CROSS_SECTIONS, default=list(CROSS_SECTIONS[:1]),
+                        help='cross sections the synthetic rounds are spread over and generated in one pass')
+    parser.add_argument('--skip-loader', action='store_true')
+    parser.add_argument('--skip-generator', action='store_true')
+    parser.add_argument('--output', help='JSON lines file the results are appended to')
+    arguments = parser.parse_args(arguments)
+
+    loader = import_loader()
+    run = {'started': datetime.datetime.now().isoformat(), 'python': sys.version.split()[0]}
+    results = []
+    for scale in arguments.scales:
+        dataset = SyntheticTims(scale, cross_sections=arguments.cross_sections)
+        if not arguments.skip_loader:
+            results.extend(benchmark_loader(loader, dataset, arguments.latency, arguments.max_workers,
+                                            arguments.per_round_max_scale))
+        if not arguments.skip_generator:
+            snapshot_path = os.path.join(tempfile.mkdtemp(), 'tims' + snapshot.NDJSON_EXTENSION)
+            write_snapshot(loader, dataset, snapshot_path)
+            results.append(benchmark_generator(scale, snapshot_path, arguments.cross_sections))
+            os.remove(snapshot_path)
+        for result in results:
+            if 'started' not in result:
+                result.update(run)
+                print(json.dumps(result))
+    if arguments.output:
+        with open(arguments.output, 'a') as f:
+            for result in results:
+                f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
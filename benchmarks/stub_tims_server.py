@@ -0,0 +1,114 @@
+"""Local HTTP stand-in for the TIMS API, serving a SyntheticTims with configurable latency.
+
+Usage: python benchmarks/stub_tims_server.py [round count] [latency seconds] [port]
+"""
+import json
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from synthetic_tims import SyntheticTims
+
+TOKEN = 'stub-token'
+
+
+class StubTimsServer:
+    def __init__(self, dataset, latency=0.0, port=0):
+        self.dataset = dataset
+        self.latency = latency
+        self.request_count = 0
+        self.bytes_sent = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(('127.0.0.1', port), create_handler(self))
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        return 'http://127.0.0.1:{}/api/'.format(self._server.server_address[1])
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever)
+        self._thread.daemon = True
+        self._thread.start()
+        return self.base_url
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_counters(self):
+        with self._lock:
+            self.request_count = 0
+            self.bytes_sent = 0
+
+    def record(self, body_size):
+        with self._lock:
+            self.request_count += 1
+            self.bytes_sent += body_size
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+
+def create_handler(stub):
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so pooled sessions can reuse connections
+        protocol_version = 'HTTP/1.1'
+        # Headers and body go out as separate writes, with Nagle and delayed ACKs every reused connection stalls
+        disable_nagle_algorithm = True
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            if urlparse(self.path).path.rstrip('/') != '/api/login':
+                return self._send(404, b'Not found')
+            self._send(200, TOKEN.encode('utf-8'))
+
+        def do_GET(self):
+            if self.headers.get('Authorization') != 'Bearer ' + TOKEN:
+                return self._send(401, b'Unauthorized')
+            url = urlparse(self.path)
+            endpoint = url.path.strip('/').split('/')[-1]
+            if endpoint not in stub.dataset.records:
+                return self._send(404, b'Not found')
+            query = parse_qs(url.query).get('q')
+            conditions = json.loads(query[0]) if query else None
+            time.sleep(stub.latency)
+            body = json.dumps(stub.dataset.query(endpoint, conditions)).encode('utf-8')
+            self._send(200, body, 'application/json')
+
+        def _send(self, status, body, content_type='text/plain'):
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            stub.record(len(body))
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == '__main__':
+    arguments = sys.argv[1:]
+    round_count = int(arguments[0]) if len(arguments) > 0 else 1000
+    latency = float(arguments[1]) if len(arguments) > 1 else 0.0
+    port = int(arguments[2]) if len(arguments) > 2 else 8000
+    server = StubTimsServer(SyntheticTims(round_count), latency, port)
+    print('Serving {} synthetic rounds at {}'.format(round_count, server.base_url))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""Synthetic TIMS project data: sections, rounds, activities and measures at a configurable scale."""
+import datetime
+import random
+
+MEASURE_DEFINITIONS = [
+    ('Selbstbohranker', 'Stk'),
+    ('SN Mörtelanker', 'Stk'),
+    ('Ortsbrustanker', 'Stk'),
+    ('Baustahlgitter 1. Lage, mit Bogen', 'm²'),
+    ('Baustahlgitter 2. Lage, mit Bogen', 'm²'),
+    ('Rammspieß', 'Stk'),
+    ('Spritzbeton Kalotte und Strosse', 'm³'),
+    ('Spritzbeton Ortsbrust', 'm³'),
+    ('Bogen', 'Stk'),
+    ('Sprengstoff', 'kg'),
+]
+ROUND_LENGTH_METER = 1.3
+CROSS_SECTIONS = ('Kalotte', 'Strosse', 'Sohle')
+PROJECT_START = datetime.datetime(2021, 3, 1, 6, 0)
+
+
+class SyntheticTims:
+    """An in-memory TIMS project answering the q=[[field, operator, value], ...] queries the loader sends."""
+
+    def __init__(self, round_count, rounds_per_section=1000, activities_per_round=3, measures_per_activity=2, seed=0,
+                 cross_sections=CROSS_SECTIONS[:1]):
+        # With several cross sections each chainage is driven once per cross section, one round after the other
+        random_generator = random.Random(seed)
+        self.records = {
+            'construction.section': [],
+            'construction.tunnel.round': [],
+            'construction.activity': [],
+            'construction.tunnel.measure': [],
+        }
+        start_time = PROJECT_START
+        for index in range(round_count):
+            if index % rounds_per_section == 0:
+                section_id = len(self.records['construction.section']) + 1
+                self.records['construction.section'].append({'id': section_id, 'name': 'Abschnitt {}'.format(section_id)})
+            duration = random_generator.randint(3, 9)
+            end_time = start_time + datetime.timedelta(hours=duration)
+            round_id = index + 1
+            chainage_index = index // len(cross_sections)
+            self.records['construction.tunnel.round'].append({
+                'id': round_id,
+                'section': section_id,
+                'start_chainage': round(chainage_index * ROUND_LENGTH_METER, 2),
+                'end_chainage': round((chainage_index + 1) * ROUND_LENGTH_METER, 2),
+                'cross_section.': {'name': cross_sections[index % len(cross_sections)]},
+                'comment': None if random_generator.random() < 0.8 else 'Nachprofilierung',
+                'start_time': to_tims_datetime(start_time),
+                'end_time': to_tims_datetime(end_time),
+                'duration': duration,
+            })
+            start_time = end_time
+            for _ in range(activities_per_round):
+                activity_id = len(self.records['construction.activity']) + 1
+                self.records['construction.activity'].append({'id': activity_id, 'round': round_id})
+                for _ in range(measures_per_activity):
+                    name, uom = random_generator.choice(MEASURE_DEFINITIONS)
+                    self.records['construction.tunnel.measure'].append({
+                        'id': len(self.records['construction.tunnel.measure']) + 1,
+                        'activity': activity_id,
+                        'measure_definition.': {'name': name},
+                        'uom.': {'name': uom},
+                        'quantity': round(random_generator.uniform(0.5, 25), 2),
+                    })
+        self._indexes = {}
+
+    @property
+    def round_count(self):
+        return len(self.records['construction.tunnel.round'])
+
+    def query(self, endpoint, conditions=None):
+        conditions = conditions or []
+        if len(conditions) == 1 and conditions[0][1] in ('=', 'in'):
+            # Single lookups by id use an index so large datasets stay fast to serve
+            field, operator, value = conditions[0]
+            index = self._get_index(endpoint, field)
+            values = value if operator == 'in' else [value]
+            return [item for v in sorted(set(values)) for item in index.get(v, [])]
+        items = self.records[endpoint]
+        for field, operator, value in conditions:
+            items = [item for item in items if matches(item.get(field), operator, value)]
+        return items
+
+    def _get_index(self, endpoint, field):
+        key = (endpoint, field)
+        if key not in self._indexes:
+            index = {}
+            for item in self.records[endpoint]:
+                index.setdefault(item.get(field), []).append(item)
+            self._indexes[key] = index
+        return self._indexes[key]
+
+
+class SyntheticClient:
+    """Answers TimsClient calls straight from a SyntheticTims, without HTTP."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.cache = None
+        self.request_count = 0
+
+    def get(self, endpoint, query=None):
+        self.request_count += 1
+        return self.dataset.query(endpoint, query)
+
+    def get_in(self, endpoint, field, values, chunk_size=200):
+        values = list(values)
+        items = []
+        for i in range(0, len(values), chunk_size):
+            items.extend(self.get(endpoint, [[field, 'in', values[i:i + chunk_size]]]))
+        return items
+
+    def map(self, function, items):
+        return [function(item) for item in items]
+
+    def close(self):
+        pass
+
+
+def matches(item_value, operator, value):
+    if operator == '=':
+        return item_value == value
+    if operator == 'in':
+        return item_value in value
+    if isinstance(item_value, dict):
+        item_value, value = from_tims_datetime(item_value), from_tims_datetime(value)
+    if operator == '>=':
+        return item_value >= value
+    if operator == '<=':
+        return item_value <= value
+    if operator == '>':
+        return item_value > value
+    if operator == '<':
+        return item_value < value
+    raise ValueError('Unsupported operator ' + operator)
+
+
+def to_tims_datetime(value):
+    return {'year': value.year, 'month': value.month, 'day': value.day, 'hour': value.hour, 'minute': value.minute}
+
+
+def from_tims_datetime(value):
+    return datetime.datetime(value['year'], value['month'], value['day'], value['hour'], value['minute'])
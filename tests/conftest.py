@@ -0,0 +1,13 @@
+import os
+import sys
+
+EXTENSION_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                   'AB-BIMExtension.extension')
+LIB_DIRECTORY = os.path.join(EXTENSION_DIRECTORY, 'lib')
+LOADER_DIRECTORY = os.path.join(EXTENSION_DIRECTORY, 'As-Built Tunnel BIM.tab', 'Model Data.panel',
+                                'Load Data from TIMS.pushbutton')
+GENERATOR_DIRECTORY = os.path.join(EXTENSION_DIRECTORY, 'As-Built Tunnel BIM.tab', 'Model Generation.panel',
+                                   'Generate Model.pushbutton')
+
+# Only the modules without Revit imports are tested, pyRevit puts these folders on the path inside Revit
+sys.path[:0] = [LIB_DIRECTORY, LOADER_DIRECTORY, GENERATOR_DIRECTORY]
@@ -0,0 +1,39 @@
+import json
+import os
+
+from as_built_rounds import AsBuiltRounds, RoundCheckpoint
+
+
+def test_batches_are_journaled_and_compacted(tmp_path):
+    file_path = str(tmp_path / 'data' / 'generation_checkpoint.json')
+    rounds = AsBuiltRounds(RoundCheckpoint(file_path, 'model.rvt'))
+    rounds.record('1', 'a')
+    rounds.commit()
+    rounds.record('2', 'b')
+    rounds.discard()
+    rounds.record('3', 'c')
+    rounds.commit()
+    assert not os.path.exists(file_path)
+    with open(file_path + '.journal') as f:
+        assert len(f.readlines()) == 2
+    # A run stopping here leaves the journal to the next one
+    checkpoint = RoundCheckpoint(file_path, 'model.rvt')
+    assert [checkpoint.get(key) for key in ('1', '2', '3')] == ['a', None, 'c']
+    checkpoint.compact()
+    assert os.listdir(os.path.dirname(file_path)) == ['generation_checkpoint.json']
+    with open(file_path) as f:
+        assert json.load(f) == {'model.rvt': {'1': 'a', '3': 'c'}}
+
+
+def test_interrupted_journal_line_is_ignored(tmp_path):
+    file_path = str(tmp_path / 'generation_checkpoint.json')
+    with open(file_path, 'w') as f:
+        json.dump({'model.rvt': {'1': 'a'}, 'other.rvt': {'1': 'x'}}, f)
+    with open(file_path + '.journal', 'w') as f:
+        f.write(json.dumps(['model.rvt', {'1': 'b', '2': 'c'}]) + '\n')
+        f.write('["model.rvt", {"3": ')
+    checkpoint = RoundCheckpoint(file_path, 'model.rvt')
+    assert [checkpoint.get(key) for key in ('1', '2', '3')] == ['b', 'c', None]
+    checkpoint.compact()
+    with open(file_path) as f:
+        assert json.load(f) == {'model.rvt': {'1': 'b', '2': 'c'}, 'other.rvt': {'1': 'x'}}
@@ -0,0 +1,83 @@
+import random
+
+from as_designed_index import AsDesignedIndex, ChainageIndex
+
+
+def element_overlap(element_A_start, element_A_end, element_B_start, element_B_end):
+    """The generator's scan before the index: either end of A inside B, bounds included."""
+    return element_B_start <= element_A_start <= element_B_end or element_B_start <= element_A_end <= element_B_end
+
+
+def scan_element_names(elements, start_meter, end_meter):
+    return [type_name for element, type_name, element_start, element_end, family_name in elements
+            if element_overlap(start_meter, end_meter, element_start, element_end)]
+
+
+def create_blocks(blocknummers, type_name='EBO_K', family_name='EBO'):
+    # Block n spans chainage n - 1 to n
+    return [('block {}'.format(blocknummer), type_name, blocknummer - 1, blocknummer, family_name)
+            for blocknummer in blocknummers]
+
+
+def test_bounds_are_inclusive():
+    index = ChainageIndex([(0, 'block', 'EBO_K', 10, 11)])
+    assert len(index.find_containing(10)) == 1
+    assert len(index.find_containing(11)) == 1
+    assert index.find_containing(9.999) == []
+    assert index.find_containing(11.001) == []
+
+
+def test_round_touching_a_block_boundary_finds_both_blocks():
+    index = AsDesignedIndex(create_blocks([1, 2, 3]))
+    assert [entry[1] for entry in index._index.find_overlapping(1, 1)] == ['block 1', 'block 2']
+
+
+def test_partial_overlap_finds_the_block_holding_an_end():
+    index = AsDesignedIndex(create_blocks([5], 'EBO_K') + create_blocks([6], 'EBO_S'))
+    assert index.find_element_name(3.5, 4.5) == 'EBO_K'
+    assert index.find_element_name(5.5, 7.5) == 'EBO_S'
+
+
+def test_round_spanning_a_whole_block_without_an_end_inside_finds_nothing():
+    # element_overlap only tests the round's ends, a block strictly inside the round does not count
+    index = AsDesignedIndex(create_blocks([5]))
+    assert index.find_element_name(3.5, 5.5) is None
+
+
+def test_reversed_chainages_match_forward_chainages():
+    index = AsDesignedIndex(create_blocks([1, 2, 3], 'EBO_K') + create_blocks([4], 'EBO_S'))
+    assert index.find_element_name(3.5, 2.5) == index.find_element_name(2.5, 3.5) == 'EBO_K'
+    assert index.find_element_name(4.0, 3.5) == index.find_element_name(3.5, 4.0) == 'EBO_S'
+
+
+def test_empty_ranges_and_empty_indexes():
+    index = AsDesignedIndex(create_blocks([1, 2]))
+    assert index.find_element_name(1.5, 1.5) == 'EBO_K'
+    assert index.find_element_name(7, 7) is None
+    empty_index = AsDesignedIndex([])
+    assert len(empty_index) == 0
+    assert empty_index.find_element_name(0, 1) is None
+    assert ChainageIndex([]).find_overlapping(0, 1) == []
+
+
+def test_family_name_restricts_the_lookup():
+    index = AsDesignedIndex(create_blocks([1, 2], 'EBO_K', 'EBO') + create_blocks([1, 2], 'EBO_S', 'EBO Strosse'))
+    assert index.find_element_name(0.5, 1.5) == 'EBO_K'
+    assert index.find_element_name(0.5, 1.5, 'EBO Strosse') == 'EBO_S'
+    assert index.find_element_name(0.5, 1.5, 'EBO Sohle') is None
+
+
+def test_results_follow_the_collector_order_of_the_scan():
+    random_generator = random.Random(7)
+    blocknummers = list(range(1, 200)) * 2
+    random_generator.shuffle(blocknummers)
+    elements = [('block {}'.format(order), 'type {}'.format(order), blocknummer - 1, blocknummer, 'EBO')
+                for order, blocknummer in enumerate(blocknummers)]
+    index = AsDesignedIndex(elements)
+    for _ in range(500):
+        start_meter = round(random_generator.uniform(-2, 202), 1)
+        end_meter = start_meter + random_generator.choice([-1.3, 0, 0.5, 1.3, 2.6])
+        expected = scan_element_names(elements, start_meter, end_meter)
+        entries = index._index.find_overlapping(start_meter, end_meter)
+        assert [entry[2] for entry in entries] == expected
+        assert index.find_element_name(start_meter, end_meter) == (expected[0] if expected else None)
@@ -0,0 +1,20 @@
+from cross_section import CrossSection, get_cross_section
+
+
+def test_cross_sections_by_id_name_and_related_object():
+    assert get_cross_section(2) is CrossSection.STROSSE
+    assert get_cross_section(' sohle ') is CrossSection.SOHLE
+    assert get_cross_section('KALLOTE') is CrossSection.KALLOTE
+    assert get_cross_section({'id': 3}) is CrossSection.SOHLE
+    assert get_cross_section({'id': 3, 'name': 'Strosse'}) is CrossSection.STROSSE
+    assert CrossSection.KALLOTE.label == 'Kalotte'
+
+
+def test_rounds_without_cross_section_are_top_heading():
+    for value in (None, '', {'name': None}):
+        assert get_cross_section(value) is CrossSection.KALLOTE
+
+
+def test_unknown_cross_sections():
+    for value in (7, 'Ortsbrust', {'id': 0}, {'name': 'Ulme'}):
+        assert get_cross_section(value) is None
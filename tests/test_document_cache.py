@@ -0,0 +1,34 @@
+import os
+
+from document_cache import DocumentCache
+
+
+def test_values_follow_the_version(tmp_path):
+    file_path = str(tmp_path / 'data' / 'cache.json')
+    cache = DocumentCache(file_path)
+    cache.set('model.rvt', 'a', 'table', [1, 2])
+    cache.set_version('model.rvt', 'a', 'b')
+    cache.save()
+    cache = DocumentCache(file_path)
+    assert cache.get('model.rvt', 'a', 'table') is None
+    assert cache.get('model.rvt', 'b', 'table') == [1, 2]
+    # Unsaved documents have no version and are not cached
+    cache.set('new.rvt', None, 'table', [3])
+    assert cache.get('new.rvt', None, 'table', 'default') == 'default'
+
+
+def test_unchanged_cache_is_not_written(tmp_path):
+    file_path = str(tmp_path / 'cache.json')
+    cache = DocumentCache(file_path)
+    cache.save()
+    assert not os.path.exists(file_path)
+    cache.set('model.rvt', 'a', 'table', [1, 2])
+    cache.save()
+    modified_time = os.path.getmtime(file_path)
+    os.utime(file_path, (0, 0))
+    cache = DocumentCache(file_path)
+    cache.set('model.rvt', 'a', 'table', [1, 2])
+    cache.set_version('model.rvt', 'a', 'a')
+    cache.save()
+    assert os.path.getmtime(file_path) == 0
+    assert modified_time != 0
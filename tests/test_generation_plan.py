@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+from generation_plan import (GenerationPlan, create_generation_plan, remove_overwritten_parameters,
+                             ROUND_TAG_PARAMETER, TEXT)
+from position_engine import POSITION_PARAMETER_NAMES
+
+
+def create_table(blocknummers, type_name='EBO_K', family_name='EBO'):
+    # Block n spans chainage n - 1 to n, every position parameter is valued by its Blocknummer
+    return [dict([('type', type_name), ('family', family_name), ('Blocknummer', blocknummer)] +
+                 [(name, float(blocknummer)) for name in POSITION_PARAMETER_NAMES])
+            for blocknummer in blocknummers]
+
+
+def create_round(round_id, start_meter, end_meter, cross_section_type='Kalotte', material=()):
+    return {
+        'id': round_id,
+        'start_meter': start_meter,
+        'end_meter': end_meter,
+        'cross_section_type': cross_section_type,
+        'comment': '',
+        'start_datetime': '1.4.2021 0:00',
+        'end_datetime': '1.4.2021 2:00',
+        'duration': '2h',
+        'material': [{'name': name, 'value': value, 'value_type': 'kg'} for name, value in material],
+    }
+
+
+def get_parameter_names(round_plan):
+    return [name for name, value, unit in round_plan.parameters]
+
+
+def test_rounds_of_other_cross_sections_are_left_out():
+    table = create_table([1, 2], 'EBO_K', 'EBO') + create_table([1, 2], 'EBO_S', 'EBO Strosse')
+    plan = GenerationPlan(table, cross_sections={'Strosse': ('EBO Strosse', 'AB Strosse')})
+    assert plan.add_round({'id': 1}, create_round(1, 0.5, 1.5, 'Kalotte', [('Anker', 2)])) is None
+    round_plan = plan.add_round({'id': 1}, create_round(2, 0.5, 1.5, 'Strosse'))
+    assert round_plan.type_name == 'EBO_S'
+    assert round_plan.family_name == 'AB Strosse'
+    assert plan.rounds == [round_plan]
+    # Material of left out rounds does not become a parameter of the as-built families
+    assert plan.material_names == set()
+    assert plan.get_cross_section_types() == set(['Strosse'])
+
+
+def test_rounds_without_cross_section_are_planned_as_kalotte():
+    plan = GenerationPlan(create_table([1]), cross_sections={'Kalotte': ('EBO', 'AB')})
+    round = create_round(1, 0.0, 1.0)
+    del round['cross_section_type']
+    assert plan.add_round({'id': 1}, round).cross_section_type == 'Kalotte'
+
+
+def test_overwritten_parameters_keep_their_last_value_in_first_order():
+    parameters = [('Anker', '1 Stk', TEXT), ('Beton', '2 m³', TEXT), ('Anker', '3 Stk', TEXT)]
+    assert remove_overwritten_parameters(parameters) == [('Beton', '2 m³', TEXT), ('Anker', '3 Stk', TEXT)]
+    assert remove_overwritten_parameters([]) == []
+
+
+def test_round_tag_comes_first_and_falls_back_to_chainage():
+    plan = GenerationPlan(create_table([1, 2]))
+    tagged = plan.add_round({'id': 1}, create_round(7, 0.5, 1.5))
+    untagged = plan.add_round({'id': 1}, create_round(None, 0.5, 1.5))
+    assert tagged.parameters[0] == (ROUND_TAG_PARAMETER, '7', TEXT)
+    assert untagged.parameters[0] == (ROUND_TAG_PARAMETER, '0.5-1.5', TEXT)
+
+
+def test_resolve_type_positions_an_untyped_round():
+    plan = create_generation_plan([({'id': 1}, create_round(1, 10.0, 11.0))], create_table([1, 2]))
+    round_plan = plan.rounds[0]
+    assert round_plan.type_name is None
+    assert not round_plan.is_positioned
+    assert not set(POSITION_PARAMETER_NAMES) & set(get_parameter_names(round_plan))
+    plan.resolve_type(round_plan, 'EBO_K')
+    assert round_plan.type_name == 'EBO_K'
+    assert round_plan.is_positioned
+    assert get_parameter_names(round_plan)[-len(POSITION_PARAMETER_NAMES):] == POSITION_PARAMETER_NAMES
+    # Positioned rounds are not positioned a second time
+    plan.plan_positions()
+    assert len(get_parameter_names(round_plan)) == len(set(get_parameter_names(round_plan)))
+
+
+def test_fingerprint_is_stable_and_follows_type_and_parameters():
+    section_rounds = [({'id': 1}, create_round(1, 0.5, 1.5, material=[('Anker', 2)]))]
+    first = create_generation_plan(section_rounds, create_table([1, 2])).rounds[0]
+    second = create_generation_plan(section_rounds, create_table([1, 2])).rounds[0]
+    assert first.get_fingerprint() == second.get_fingerprint()
+    retyped = create_generation_plan(section_rounds, create_table([1, 2], 'EBO_L')).rounds[0]
+    assert retyped.get_fingerprint() != first.get_fingerprint()
+    changed = create_generation_plan([({'id': 1}, create_round(1, 0.5, 1.5, material=[('Anker', 3)]))],
+                                     create_table([1, 2])).rounds[0]
+    assert changed.get_fingerprint() != first.get_fingerprint()
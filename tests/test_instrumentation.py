@@ -0,0 +1,23 @@
+from instrumentation import Instrumentation
+
+
+def test_iterate_records_one_span_for_the_whole_iteration():
+    instrumentation = Instrumentation()
+    assert list(instrumentation.iterate('read', (item for item in range(3)))) == [0, 1, 2]
+    assert instrumentation.spans['read'][0] == 1
+
+
+def test_iterate_records_iterations_stopped_early():
+    instrumentation = Instrumentation()
+    items = instrumentation.iterate('read', range(3))
+    assert next(items) == 0
+    assert 'read' not in instrumentation.spans
+    items.close()
+    assert instrumentation.spans['read'][0] == 1
+
+
+def test_iterate_passes_through_when_switched_off():
+    instrumentation = Instrumentation(enabled=False)
+    items = [1, 2]
+    assert instrumentation.iterate('read', items) is items
+    assert instrumentation.spans == {}
@@ -0,0 +1,128 @@
+import random
+
+import pytest
+
+numpy = pytest.importorskip('numpy')
+
+import material_rollup
+
+
+def create_round(round_id, start_meter, end_meter, cross_section_type='Kalotte', **quantities):
+    return {
+        'id': round_id,
+        'start_meter': start_meter,
+        'end_meter': end_meter,
+        'cross_section_type': cross_section_type,
+        'material': [{'name': name, 'value': value, 'value_type': 'kg'} for name, value in sorted(quantities.items())],
+    }
+
+
+def create_section(section_id):
+    return {'id': section_id, 'name': 'Section ' + str(section_id)}
+
+
+def test_section_totals_and_rates():
+    section = create_section(1)
+    rollup = material_rollup.MaterialRollup([
+        (section, create_round(1, 0.0, 2.0, Sprengstoff=10.0)),
+        (section, create_round(2, 2.0, 4.0, Sprengstoff=30.0)),
+        (section, create_round(3, 0.0, 5.0, 'Strosse', Sprengstoff=5.0)),
+    ])
+    rows = rollup.get_section_rows()
+    assert sorted(rows) == sorted([
+        [1, 'Section 1', 'Kalotte', 'Sprengstoff', 'kg', 2, 4.0, 40.0, 10.0],
+        [1, 'Section 1', 'Strosse', 'Sprengstoff', 'kg', 1, 5.0, 5.0, 1.0],
+    ])
+
+
+def test_chainage_bins_and_cumulative_curve():
+    section = create_section(1)
+    rollup = material_rollup.MaterialRollup([
+        (section, create_round(1, 12.0, 14.0, Anker=2.0)),
+        (section, create_round(2, 14.0, 16.0, Anker=3.0)),
+        (section, create_round(3, 34.0, 36.0, Anker=4.0)),
+    ])
+    rows = rollup.get_chainage_rows(bin_meter=10.0)
+    # The empty bin between 20 and 30 is left out while the cumulative curve runs on
+    assert rows == [
+        [10.0, 20.0, 'Anker', 'kg', 2, 5.0, 0.5, 5.0],
+        [30.0, 40.0, 'Anker', 'kg', 1, 4.0, 0.4, 9.0],
+    ]
+    assert rollup.get_chainage_rows(bin_meter=10.0, start_meter=30.0) == [
+        [30.0, 40.0, 'Anker', 'kg', 1, 4.0, 0.4, 4.0],
+    ]
+
+
+def test_chainage_bins_need_positive_length():
+    rollup = material_rollup.MaterialRollup([(create_section(1), create_round(1, 0.0, 2.0, Anker=1.0))])
+    for bin_meter in (0, -1.0):
+        with pytest.raises(ValueError):
+            rollup.get_chainage_rows(bin_meter=bin_meter)
+
+
+def test_rounds_without_chainage_are_skipped():
+    section = create_section(1)
+    rollup = material_rollup.MaterialRollup([
+        (section, create_round(1, None, 2.0, Anker=1.0)),
+        (section, create_round(2, 2.0, float('nan'), Anker=1.0)),
+        (section, create_round(3, 2.0, 4.0, Anker=1.0, Beton='n/a')),
+    ])
+    assert rollup.skipped_round_count == 2
+    assert rollup.round_ids == [3]
+    assert rollup.measures == [('Anker', 'kg')]
+    assert rollup.get_chainage_rows(bin_meter=1.0)[0][:2] == [3.0, 4.0]
+
+
+def test_round_summaries_restart_per_section_and_cross_section():
+    first, second = create_section(1), create_section(2)
+    # Unsorted on purpose, the cumulative follows chainage and not the input order
+    rollup = material_rollup.MaterialRollup([
+        (first, create_round(3, 4.0, 6.0, Sprengstoff=3.0)),
+        (second, create_round(10, 0.0, 2.0, Sprengstoff=7.0)),
+        (first, create_round(1, 0.0, 2.0, Sprengstoff=1.0)),
+        (first, create_round(4, 0.0, 2.0, 'Strosse', Sprengstoff=5.0)),
+        (first, create_round(2, 4.0, 2.0, Sprengstoff=2.0, Anker=9.0)),
+        (first, create_round(None, 6.0, 8.0, Sprengstoff=4.0)),
+    ])
+    summaries = rollup.get_round_summaries(['Sprengstoff'])
+    assert summaries == {
+        1: [('Sprengstoff', 'kg', 0.5, 1.0)],
+        2: [('Sprengstoff', 'kg', 1.0, 3.0)],
+        3: [('Sprengstoff', 'kg', 1.5, 6.0)],
+        4: [('Sprengstoff', 'kg', 2.5, 5.0)],
+        10: [('Sprengstoff', 'kg', 3.5, 7.0)],
+    }
+    assert rollup.get_round_summaries(['Beton']) == {}
+
+
+def test_round_summaries_match_a_plain_running_sum():
+    generator = random.Random(7)
+    sections = [create_section(section_id) for section_id in range(4)]
+    section_rounds = []
+    for round_id in range(500):
+        start_meter = generator.randrange(0, 1000) * 1.5
+        end_meter = start_meter + generator.choice([-1.5, 1.5])
+        cross_section_type = generator.choice(['Kalotte', 'Strosse', 'Sohle'])
+        quantities = {'Sprengstoff': generator.uniform(0, 20)}
+        if generator.random() < 0.5:
+            quantities['Anker'] = generator.randrange(0, 10)
+        section_rounds.append((generator.choice(sections),
+                               create_round(round_id, start_meter, end_meter, cross_section_type, **quantities)))
+    rollup = material_rollup.MaterialRollup(section_rounds)
+    summaries = rollup.get_round_summaries(['Anker', 'Sprengstoff'])
+
+    groups = {}
+    for section, round in section_rounds:
+        groups.setdefault((section['id'], round['cross_section_type']), []).append(round)
+    for rounds in groups.values():
+        rounds.sort(key=lambda round: (min(round['start_meter'], round['end_meter']), round['id']))
+        totals = {'Anker': 0.0, 'Sprengstoff': 0.0}
+        for round in rounds:
+            length = abs(round['end_meter'] - round['start_meter'])
+            quantities = dict((item['name'], item['value']) for item in round['material'])
+            expected = []
+            for name, uom, per_meter, cumulative in summaries[round['id']]:
+                totals[name] += quantities.get(name, 0.0)
+                assert per_meter == pytest.approx(quantities.get(name, 0.0) / length)
+                expected.append(totals[name])
+            assert [summary[3] for summary in summaries[round['id']]] == pytest.approx(expected)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+import random
+
+import pytest
+
+import position_engine
+from position_engine import PositionEngine, POSITION_PARAMETER_NAMES, MEAN, WEIGHTED
+
+
+def element_overlap(element_A_start, element_A_end, element_B_start, element_B_end):
+    """The generator's scan before the engine: either end of A inside B, bounds included."""
+    return element_B_start <= element_A_start <= element_B_end or element_B_start <= element_A_end <= element_B_end
+
+
+def create_table(blocknummers, type_name='EBO_K'):
+    # Every position parameter of a block is valued by its Blocknummer, offset per parameter
+    return [dict([('type', type_name), ('Blocknummer', blocknummer)] +
+                 [(name, blocknummer + offset) for offset, name in enumerate(POSITION_PARAMETER_NAMES)])
+            for blocknummer in blocknummers]
+
+
+def approximate_parameters(table, start_meter, end_meter):
+    """Plain mean of the blocks element_overlap matches, as approximate_parameter averaged them."""
+    rows = [row for row in table
+            if element_overlap(start_meter, end_meter, row['Blocknummer'] - 1, row['Blocknummer'])]
+    if not rows:
+        return [0] * len(POSITION_PARAMETER_NAMES)
+    return [sum(row[name] for row in rows) / float(len(rows)) for name in POSITION_PARAMETER_NAMES]
+
+
+def flatten(positions):
+    return [value for values in positions for value in values]
+
+
+def compute_scalar(engine, type_name, start_meters, end_meters, monkeypatch):
+    monkeypatch.setattr(position_engine, 'numpy', None)
+    return engine.compute(type_name, start_meters, end_meters)
+
+
+def test_weighted_averages_by_overlap_length():
+    engine = PositionEngine(create_table(range(1, 20)), WEIGHTED)
+    # 0.8 m of block 9, 1 m each of blocks 10 to 12
+    [values] = engine.compute('EBO_K', [8.2], [12.0])
+    assert values[0] == pytest.approx((9 * 0.8 + 10 + 11 + 12) / 3.8)
+
+
+@pytest.mark.parametrize('mode', [MEAN, WEIGHTED])
+def test_reversed_rounds_match_forward_rounds(mode, monkeypatch):
+    engine = PositionEngine(create_table(range(1, 20)), mode)
+    forward = engine.compute('EBO_K', [8.2, 3.0, 5.5], [12.0, 4.0, 5.7])
+    backward = engine.compute('EBO_K', [12.0, 4.0, 5.7], [8.2, 3.0, 5.5])
+    assert flatten(backward) == pytest.approx(flatten(forward))
+    assert 0 not in flatten(backward)
+    scalar = compute_scalar(engine, 'EBO_K', [12.0, 4.0, 5.7], [8.2, 3.0, 5.5], monkeypatch)
+    assert flatten(scalar) == pytest.approx(flatten(forward))
+
+
+def test_mean_matches_element_overlap_mean():
+    generator = random.Random(3)
+    table = create_table(generator.sample(range(1, 60), 40))
+    engine = PositionEngine(table, MEAN)
+    start_meters = [generator.uniform(-2, 62) for _ in range(200)]
+    end_meters = [start_meter + generator.choice([-1, 1]) * generator.uniform(0, 3) for start_meter in start_meters]
+    results = engine.compute('EBO_K', start_meters, end_meters)
+    for start_meter, end_meter, values in zip(start_meters, end_meters, results):
+        assert values == pytest.approx(approximate_parameters(table, start_meter, end_meter))
+
+
+@pytest.mark.parametrize('mode', [MEAN, WEIGHTED])
+def test_vectorized_matches_scalar(mode, monkeypatch):
+    pytest.importorskip('numpy')
+    generator = random.Random(5)
+    table = create_table(generator.sample(range(1, 80), 60))
+    table[7]['Querneigung'] = None
+    engine = PositionEngine(table, mode)
+    start_meters = [generator.uniform(-2, 82) for _ in range(300)]
+    end_meters = [start_meter + generator.choice([-1, 1]) * generator.uniform(0, 4) for start_meter in start_meters]
+    vectorized = engine.compute('EBO_K', start_meters, end_meters)
+    scalar = compute_scalar(engine, 'EBO_K', start_meters, end_meters, monkeypatch)
+    assert flatten(vectorized) == pytest.approx(flatten(scalar))
+
+
+def test_unknown_types_and_rounds_outside_the_model_are_zero():
+    engine = PositionEngine(create_table([1, 2]), WEIGHTED)
+    assert engine.compute('EBO_S', [0.5], [1.5]) == [[0] * len(POSITION_PARAMETER_NAMES)]
+    assert engine.compute('EBO_K', [10.0], [11.0]) == [[0] * len(POSITION_PARAMETER_NAMES)]
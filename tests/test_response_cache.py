@@ -0,0 +1,27 @@
+import os
+
+from response_cache import ResponseCache
+
+
+def test_least_recently_used_entries_are_evicted_over_the_size(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size_bytes=10)
+    cache.store('round', 'a', b'1234')
+    cache.store('round', 'b', b'1234')
+    cache.lookup('round', 'a')
+    # Replacing an entry counts its new size only
+    cache.store('round', 'b', b'123')
+    assert cache.lookup('round', 'b')[0].body == b'123'
+    cache.store('round', 'c', b'1234')
+    assert cache.lookup('round', 'a')[0] is None
+    assert [cache.lookup('round', url)[0].body for url in ('b', 'c')] == [b'123', b'1234']
+    assert len(os.listdir(str(tmp_path))) == 2
+
+
+def test_total_size_is_restored_from_the_saved_index(tmp_path):
+    cache = ResponseCache(str(tmp_path), max_size_bytes=10)
+    cache.store('round', 'a', b'123456')
+    cache.save()
+    cache = ResponseCache(str(tmp_path), max_size_bytes=10)
+    cache.store('round', 'b', b'123456')
+    assert cache.lookup('round', 'a')[0] is None
+    assert cache.lookup('round', 'b')[0].body == b'123456'
@@ -0,0 +1,25 @@
+import datetime
+
+from round_filter import RoundFilter, NO_FILTER
+
+
+def test_empty_filter_only_selects_the_section():
+    assert NO_FILTER.is_empty()
+    assert NO_FILTER.get_section_query() is None
+    assert NO_FILTER.get_round_query(3) == [["section", "=", 3]]
+
+
+def test_time_window_is_sent_as_tryton_datetimes():
+    round_filter = RoundFilter([3], 100.0, 200.0, datetime.datetime(2021, 3, 1, 6),
+                               datetime.datetime(2021, 3, 31, 18, 30))
+    assert not round_filter.is_empty()
+    assert round_filter.get_section_query() == [["id", "in", [3]]]
+    assert round_filter.get_round_query(3) == [
+        ["section", "=", 3],
+        ["end_chainage", ">=", 100.0],
+        ["start_chainage", "<=", 200.0],
+        ["end_time", ">=", {'__class__': 'datetime', 'year': 2021, 'month': 3, 'day': 1, 'hour': 6, 'minute': 0,
+                            'second': 0, 'microsecond': 0}],
+        ["start_time", "<", {'__class__': 'datetime', 'year': 2021, 'month': 3, 'day': 31, 'hour': 18, 'minute': 30,
+                             'second': 0, 'microsecond': 0}],
+    ]
@@ -0,0 +1,40 @@
+from round_table import RoundTable, NumberColumn
+
+
+def create_round(round_id, start_meter, end_meter, material):
+    return {
+        'id': round_id,
+        'start_meter': start_meter,
+        'end_meter': end_meter,
+        'cross_section_type': 'Kalotte',
+        'comment': '',
+        'start_datetime': '1.3.2021 6:0',
+        'end_datetime': '1.3.2021 9:30',
+        'duration': '3.5h',
+        'material': material,
+    }
+
+
+def test_number_column_keeps_integers_floats_and_missing_numbers():
+    column = NumberColumn()
+    for value in (3, 2.5, None, 0):
+        column.append(value)
+    values = [column[index] for index in range(len(column))]
+    assert values == [3, 2.5, None, 0]
+    assert [type(value) for value in values] == [int, float, type(None), int]
+
+
+def test_snapshot_round_trip():
+    data = {'sections': [
+        {'id': 1, 'name': 'Section 1', 'rounds': [
+            create_round(1, 0.0, 1.3, [{'name': 'Sprengstoff', 'value_type': 'kg', 'value': 12.5}]),
+            create_round(2, None, None, [{'name': 'Anker', 'value_type': 'Stk', 'value': None}]),
+        ]},
+        {'id': 2, 'name': 'Section 2', 'rounds': [
+            create_round(3, 100, 101, [{'name': 'Sprengstoff', 'value_type': 'kg', 'value': 4}]),
+        ]},
+    ]}
+    table = RoundTable.from_snapshot(data)
+    assert len(table) == 3
+    assert table.to_snapshot() == data
+    assert table.get_round_indexes() == {1: 0, 2: 1, 3: 2}
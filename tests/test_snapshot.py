@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+import snapshot
+
+
+def create_round(round_id):
+    return {'id': round_id, 'start_meter': float(round_id), 'end_meter': float(round_id + 1), 'material': []}
+
+
+def test_empty_snapshots_hold_no_rounds(tmp_path):
+    for content in ('', '\n', '\n\n'):
+        file_path = str(tmp_path / 'tims.ndjson')
+        with open(file_path, 'w') as f:
+            f.write(content)
+        assert list(snapshot.iterate_rounds(file_path)) == []
+
+
+def test_both_formats_read_alike(tmp_path):
+    data = {'sections': [{'id': 1, 'name': 'Section', 'rounds': [create_round(1), create_round(2)]}]}
+    ndjson_path = str(tmp_path / 'tims.ndjson')
+    json_path = str(tmp_path / 'tims.json')
+    with snapshot.SnapshotWriter(ndjson_path) as snapshot_writer:
+        snapshot_writer.write_data(data)
+    snapshot.write_document(json_path, data)
+    assert snapshot.read_snapshot(ndjson_path) == snapshot.read_snapshot(json_path) == data
+    assert sorted(os.listdir(str(tmp_path))) == ['tims.json', 'tims.ndjson']
+
+
+def test_snapshot_appears_once_complete(tmp_path):
+    file_path = str(tmp_path / 'tims.ndjson')
+    snapshot_writer = snapshot.SnapshotWriter(file_path)
+    snapshot_writer.write_round(1, 'Section', create_round(1))
+    assert not os.path.exists(file_path)
+    snapshot_writer.close()
+    assert [round['id'] for section, round in snapshot.iterate_rounds(file_path)] == [1]
+
+
+def test_failed_snapshot_keeps_previous_one(tmp_path):
+    file_path = str(tmp_path / 'tims.ndjson')
+    with snapshot.SnapshotWriter(file_path) as snapshot_writer:
+        snapshot_writer.write_round(1, 'Section', create_round(1))
+    with pytest.raises(RuntimeError):
+        with snapshot.SnapshotWriter(file_path) as snapshot_writer:
+            snapshot_writer.write_round(1, 'Section', create_round(2))
+            raise RuntimeError('Connection lost')
+    assert [round['id'] for section, round in snapshot.iterate_rounds(file_path)] == [1]
+    assert os.listdir(str(tmp_path)) == ['tims.ndjson']
@@ -0,0 +1,33 @@
+import datetime
+
+import snapshot_store
+
+
+def create_round(round_id, start_datetime, end_datetime):
+    return {
+        'id': round_id,
+        'start_meter': float(round_id),
+        'end_meter': float(round_id + 1),
+        'cross_section_type': 'Kalotte',
+        'comment': '',
+        'start_datetime': start_datetime,
+        'end_datetime': end_datetime,
+        'duration': '1h',
+        'material': [],
+    }
+
+
+def test_time_window_ends_before_end_time(tmp_path):
+    with snapshot_store.SnapshotStore(str(tmp_path / 'tims.sqlite')) as store:
+        store.write_round(1, 'Section', create_round(1, '31.3.2021 23:00', '1.4.2021 0:00'))
+        store.write_round(1, 'Section', create_round(2, '1.4.2021 0:00', '1.4.2021 2:00'))
+        store.write_round(1, 'Section', create_round(3, '1.4.2021 2:00', '1.4.2021 3:00'))
+        # The generator asks for days and bumps the last one, 1.3.2021 - 31.3.2021 reaches until 1.4.2021 0:00
+        march = [round['id'] for section, round in
+                 store.iterate_rounds(start_time=datetime.datetime(2021, 3, 1),
+                                      end_time=datetime.datetime(2021, 4, 1))]
+        assert march == [1]
+        april = [round['id'] for section, round in
+                 store.iterate_rounds(start_time=datetime.datetime(2021, 4, 1),
+                                      end_time=datetime.datetime(2021, 4, 1, 2))]
+        assert april == [1, 2]